@@ -0,0 +1,200 @@
+import streamlit as st
+import altair as alt
+import os
+import analytics
+import rater_stats
+from completion import CompletionIndex
+import surveys
+from survey_loader import load_survey
+
+# ---------------------------
+# 頁面設定
+# ---------------------------
+st.set_page_config(page_title="部門互評結果", layout="wide")
+st.title("📊 部門互評結果")
+
+# 網址 ?survey=<代號> 或側邊欄切換問卷
+codes = surveys.available()
+default = st.query_params.get("survey", surveys.DEFAULT_SURVEY)
+survey_code = st.sidebar.selectbox("問卷", codes, index=codes.index(default) if default in codes else 0)
+st.query_params["survey"] = survey_code
+config = surveys.get(survey_code)
+
+
+@st.cache_resource(show_spinner=False)
+def results_store(survey_code, backend):
+    # 每份問卷、每種儲存在整個 process 一個，SQLite 的連線設定與 schema 檢查不必每次 rerun 重做
+    return surveys.get(survey_code).open_store(backend)
+
+
+store = results_store(survey_code, os.environ.get("SURVEY_STORAGE", "csv"))
+# 填答端 process 當掉時留下、還沒補寫的提交日誌先補寫，進度與彙總才不會少算
+config.replay_journals(store)
+aggregates_file = config.aggregates_path
+PAGE_SIZE = 50
+
+
+# ---------------------------
+# 總覽只讀預先計算好的彙總（大小與人數成正比，與結果筆數無關）
+# ---------------------------
+@st.cache_data(show_spinner=False)
+def load_summary(survey_code, path, mtime_ns):
+    # 彙總檔不存在時由結果儲存重建一次並寫回
+    aggs = analytics.load(path, store)
+    return {name: analytics.to_frame(aggs, name) for name in analytics.GROUPINGS}
+
+
+def file_mtime(path):
+    return os.stat(path).st_mtime_ns if os.path.exists(path) else 0
+
+
+# 明細依篩選條件延遲載入；結果檔變更後 cache 自動失效（survey_code 區分各問卷的儲存）
+@st.cache_data(show_spinner="讀取明細中…", max_entries=64)
+def load_page(survey_code, reviewee, project, offset, version):
+    return store.page(reviewee=reviewee, project=project, offset=offset, limit=PAGE_SIZE)
+
+
+@st.cache_data(show_spinner="讀取明細中…", max_entries=32)
+def load_rows(survey_code, reviewee, project, version):
+    return store.query(reviewee=reviewee, project=project)
+
+
+# 評分者校正、信度與 bootstrap 信賴區間需要整張結果表，同一版本只算一次
+# SURVEY_STATS_WORKERS：在 admin process 內開的 bootstrap worker 數，預設 2，避免佔滿所有核心
+STATS_WORKERS = int(os.environ.get("SURVEY_STATS_WORKERS", "2"))
+
+
+@st.cache_data(show_spinner="計算評分者統計中…", max_entries=4)
+def load_rater_stats(survey_code, version):
+    return rater_stats.analyze(store.query(), workers=STATS_WORKERS)
+
+
+# ---------------------------
+# 填答進度：名單索引整個 process 共用，每次只補讀新增的提交
+# ---------------------------
+@st.cache_resource(show_spinner=False)
+def completion_index(survey_code, survey_version):
+    return CompletionIndex(survey.review_map)
+
+
+survey = load_survey(config.questions_path, config.roster_path, config.bundle_path)
+tracker = completion_index(survey_code, survey.version)
+tracker.refresh(store)
+
+tab_done, tab_heat, tab_proj, tab_calib, tab_drill = st.tabs(
+    ["✅ 填答進度", "🔥 被評者 × 大項目", "📁 專案比較", "🎯 評分校正", "🔍 明細"])
+
+with tab_done:
+    done, total = tracker.overall()
+    st.progress(done / total if total else 0.0, text=f"整體填答率 {done}/{total}")
+    by_proj = tracker.by_project().sort_values("填答率")
+    st.dataframe(by_proj, hide_index=True, use_container_width=True,
+                 column_config={"填答率": st.column_config.ProgressColumn("填答率", format="percent", min_value=0, max_value=1)})
+    proj = st.selectbox("未填名單", ["（全部）"] + list(by_proj["專案"]))
+    pending = tracker.pending(None if proj == "（全部）" else proj)
+    st.caption(f"尚未填寫 {len(pending)} 人")
+    st.write("、".join(pending) or "🎉 全部完成")
+
+summary = load_summary(survey_code, aggregates_file, file_mtime(aggregates_file))
+by_target = summary["被評者"]
+if by_target.empty:
+    tab_heat.info("目前還沒有任何提交結果。")
+    st.stop()
+
+results_version = store.version()
+
+with tab_heat:
+    c1, c2, c3 = st.columns(3)
+    c1.metric("評分筆數", f"{int(by_target['筆數'].sum()):,}")
+    c2.metric("被評者人數", len(by_target))
+    c3.metric("整體平均", f"{(by_target['平均'] * by_target['筆數']).sum() / by_target['筆數'].sum():.2f}")
+
+# ---------------------------
+# 熱力圖：被評者 × 大項目
+# ---------------------------
+with tab_heat:
+    heat = summary["被評者_大項目"]
+    st.altair_chart(
+        alt.Chart(heat).mark_rect().encode(
+            x=alt.X("大項目:N", title=None),
+            y=alt.Y("被評者:N", title=None, sort="ascending"),
+            color=alt.Color("平均:Q", scale=alt.Scale(scheme="blues", domain=[1, 10])),
+            tooltip=["被評者", "大項目", alt.Tooltip("平均:Q", format=".2f"), "筆數"],
+        ).properties(height=max(300, 22 * heat["被評者"].nunique())),
+        use_container_width=True,
+    )
+
+# ---------------------------
+# 專案比較
+# ---------------------------
+with tab_proj:
+    by_proj = summary["專案"].sort_values("平均", ascending=False)
+    st.altair_chart(
+        alt.Chart(by_proj).mark_bar().encode(
+            x=alt.X("平均:Q", scale=alt.Scale(domain=[0, 10])),
+            y=alt.Y("專案:N", sort="-x", title=None),
+            tooltip=["專案", alt.Tooltip("平均:Q", format=".2f"), "筆數"],
+        ),
+        use_container_width=True,
+    )
+    st.dataframe(by_proj, hide_index=True, use_container_width=True)
+
+# ---------------------------
+# 評分校正：寬鬆／嚴格的評分者、子項目信度、被評者平均的信賴區間
+# ---------------------------
+with tab_calib:
+    if st.toggle("計算評分者統計", help="需讀取全部結果；同一版本的結果只計算一次"):
+        stats = load_rater_stats(survey_code, results_version)
+        st.subheader("子項目信度")
+        st.dataframe(stats["信度"].round(3), hide_index=True, use_container_width=True)
+        st.subheader("評分者寬嚴")
+        st.caption("平均越高越寬鬆；標準差小代表幾乎都給同一個分數")
+        st.dataframe(stats["評分者"].sort_values("平均", ascending=False).round(2),
+                     hide_index=True, use_container_width=True)
+        st.subheader("被評者平均（95% bootstrap 信賴區間）")
+        ci = stats["被評者"].sort_values("平均_標準化", ascending=False)
+        st.altair_chart(
+            alt.Chart(ci).mark_errorbar().encode(
+                x=alt.X("下界_標準化:Q", title="標準化平均"), x2="上界_標準化:Q",
+                y=alt.Y("被評者:N", sort=list(ci["被評者"]), title=None),
+            ) + alt.Chart(ci).mark_point(filled=True).encode(
+                x="平均_標準化:Q", y=alt.Y("被評者:N", sort=list(ci["被評者"])),
+                tooltip=["被評者", alt.Tooltip("平均:Q", format=".2f"), alt.Tooltip("平均_標準化:Q", format=".2f"),
+                         "評分數"],
+            ),
+            use_container_width=True,
+        )
+        st.dataframe(ci.round(3), hide_index=True, use_container_width=True)
+
+# ---------------------------
+# 明細：選定被評者或專案後才讀原始資料
+# ---------------------------
+with tab_drill:
+    col_t, col_p = st.columns(2)
+    reviewee = col_t.selectbox("被評者", ["（全部）"] + sorted(by_target["被評者"]))
+    project  = col_p.selectbox("專案", ["（全部）"] + sorted(summary["專案"]["專案"]))
+    reviewee = None if reviewee == "（全部）" else reviewee
+    project  = None if project == "（全部）" else project
+
+    if reviewee is None and project is None:
+        st.caption("請先選擇被評者或專案。")
+        st.stop()
+
+    rows = load_rows(survey_code, reviewee, project, results_version)
+    st.subheader("子項目分數分布")
+    dist = rows.groupby(["大項目", "子項目", "分數"], sort=False, observed=True).size().rename("次數").reset_index()
+    st.altair_chart(
+        alt.Chart(dist).mark_bar().encode(
+            x=alt.X("分數:O", scale=alt.Scale(domain=list(analytics.SCORES))),
+            y="次數:Q",
+            facet=alt.Facet("子項目:N", columns=4, title=None),
+            tooltip=["大項目", "子項目", "分數", "次數"],
+        ).properties(width=160, height=120),
+    )
+
+    st.subheader("原始紀錄")
+    _, total = load_page(survey_code, reviewee, project, 0, results_version)
+    n_pages = max(1, -(-total // PAGE_SIZE))
+    page_no = st.number_input(f"頁碼（共 {n_pages} 頁、{total} 筆）", min_value=1, max_value=n_pages, value=1)
+    page_df, _ = load_page(survey_code, reviewee, project, (page_no - 1) * PAGE_SIZE, results_version)
+    st.dataframe(page_df, hide_index=True, use_container_width=True)
@@ -0,0 +1,179 @@
+import argparse
+import json
+import logging
+import os
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+from storage import RESULT_COLUMNS, SqliteStore, file_lock, read_parquet
+
+logger = logging.getLogger("survey.analytics")
+
+# ---------------------------
+# 物化彙總：每個分組鍵保存 [筆數, 總分, 1 分次數, ..., 10 分次數]
+# ---------------------------
+GROUPINGS = {
+    "被評者": ("被評者",),
+    "專案": ("專案",),
+    "大項目": ("大項目",),
+    "子項目": ("大項目", "子項目"),
+    "被評者_大項目": ("被評者", "大項目"),
+}
+SCORES = range(1, 11)
+_SEP = "\t"
+
+
+def empty():
+    return {name: {} for name in GROUPINGS}
+
+
+def _read(path):
+    if not os.path.exists(path):
+        return empty()
+    with open(path, encoding="utf-8") as f:
+        aggs = json.load(f)
+    for name in GROUPINGS:
+        aggs.setdefault(name, {})
+    return aggs
+
+
+def load(path, store=None):
+    """讀取彙總；檔案不存在（第一次啟動、被刪除）且給了 store 時先由結果儲存全量重建。"""
+    if store is None or os.path.exists(path):
+        return _read(path)
+    with file_lock(path):
+        return _load_or_rebuild(path, store)[0]
+
+
+def save(path, aggs):
+    # 先寫暫存檔再 replace，讀取端不會看到寫到一半的 JSON
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(aggs, f, ensure_ascii=False)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def apply_rows(aggs, rows):
+    """把一次提交的列累加進彙總，成本只和本次列數有關。"""
+    for row in rows:
+        score = int(row["分數"])
+        for name, cols in GROUPINGS.items():
+            key = _SEP.join(str(row[c]) for c in cols)
+            stat = aggs[name].setdefault(key, [0, 0] + [0] * len(SCORES))
+            stat[0] += 1
+            stat[1] += score
+            stat[1 + score] += 1
+    return aggs
+
+
+def _load_or_rebuild(path, store):
+    # 呼叫端持有 path 的鎖；回傳 (彙總, 是否剛重建)
+    if store is None or os.path.exists(path):
+        return _read(path), False
+    aggs = rebuild(store.query())
+    save(path, aggs)
+    return aggs, True
+
+
+@contextmanager
+def updating(path, store):
+    """結果寫入與彙總更新在同一個鎖內完成：
+
+        with analytics.updating(path, store) as record:
+            store.append(rows)
+            record(rows)
+
+    彙總檔不存在時在鎖內由 store 重建（已含剛寫入的列）。所有寫入都經過這裡，重建時
+    不會有其他 process 的寫入夾在中間，不會重複或遺漏。with 內拋出例外時不更新彙總；
+    彙總本身更新失敗時刪除彙總檔，下次更新時重建，不讓呼叫端重試而重複寫入結果。
+    """
+    with file_lock(path):
+        written = []
+        yield written.extend
+        try:
+            aggs, rebuilt = _load_or_rebuild(path, store)
+            if written and not rebuilt:
+                save(path, apply_rows(aggs, written))
+        except Exception:
+            logger.exception("更新彙總 %s 失敗，刪除後下次重建", path)
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+
+def append(path, store, rows):
+    """把 rows 寫入 store 並更新彙總（提交佇列的批次寫入使用）。"""
+    with updating(path, store) as record:
+        store.append(rows)
+        record(rows)
+
+
+# ---------------------------
+# 全量重建：向量化 groupby
+# ---------------------------
+def rebuild(df):
+    aggs = empty()
+    if df.empty:
+        return aggs
+    scores = df["分數"].astype(np.int64)
+    hist = pd.get_dummies(scores).reindex(columns=list(SCORES), fill_value=0).astype(np.int64)
+    base = pd.concat([df[list({c for cols in GROUPINGS.values() for c in cols})].astype(str),
+                      scores.rename("分數"), hist], axis=1)
+    for name, cols in GROUPINGS.items():
+        g = base.groupby(list(cols), sort=False)
+        stats = pd.concat([g.size().rename("筆數"), g["分數"].sum(), g[list(SCORES)].sum()], axis=1)
+        keys = stats.index if len(cols) > 1 else [(k,) for k in stats.index]
+        aggs[name] = {_SEP.join(k): [int(v) for v in vals]
+                      for k, vals in zip(keys, stats.to_numpy())}
+    return aggs
+
+
+def to_frame(aggs, name):
+    """把某個分組的彙總展開成 DataFrame（分組欄、筆數、平均、1–10 分布）。"""
+    cols = GROUPINGS[name]
+    records = [key.split(_SEP) + stat for key, stat in aggs[name].items()]
+    df = pd.DataFrame(records, columns=[*cols, "筆數", "總分", *map(str, SCORES)])
+    df.insert(len(cols) + 1, "平均", df["總分"] / df["筆數"].where(df["筆數"] > 0))
+    return df.drop(columns="總分")
+
+
+def read_results(source, survey=None):
+    # 重建只需要分組欄位與分數，Parquet 來源只讀這幾欄
+    if source.endswith(".db"):
+        return SqliteStore(source).query()
+    if os.path.isdir(source):
+        columns = list(dict.fromkeys(c for cols in GROUPINGS.values() for c in cols)) + ["分數"]
+        return read_parquet(source, survey, columns=columns)
+    if not os.path.exists(source):
+        return pd.DataFrame(columns=RESULT_COLUMNS)
+    return pd.read_csv(source)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="問卷結果彙總")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p_rebuild = sub.add_parser("rebuild", help="從原始結果重新計算全部彙總")
+    p_rebuild.add_argument("source", help="results.csv、SQLite .db 或 Parquet 根目錄")
+    p_rebuild.add_argument("--survey", help="Parquet 來源時只讀這個問卷分區")
+    p_rebuild.add_argument("out", help="彙總 JSON，例如 data/aggregates.json")
+    args = parser.parse_args()
+
+    if args.cmd == "rebuild":
+        import submit_queue
+        import surveys
+
+        # 來源可能是任一份問卷的檔案；還有未補寫的提交日誌時重建會少算，先請使用者補寫
+        codes = [args.survey] if args.survey else surveys.available()
+        pending = [c for c in codes if surveys.get(c) and submit_queue.orphaned(surveys.get(c).journal_dir)]
+        if pending:
+            parser.error(f"問卷 {'、'.join(pending)} 有尚未補寫的提交日誌，"
+                         f"請先執行 python submit_queue.py --survey <代號> --storage <儲存方式>")
+        df = read_results(args.source, args.survey)
+        with file_lock(args.out):
+            save(args.out, rebuild(df))
+        print(f"已由 {len(df)} 筆結果重建彙總：{args.out}")
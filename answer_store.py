@@ -0,0 +1,60 @@
+class AnswerStore:
+    """一位填答者的所有分數：每個 (對象頁, 題號) 佔 1 byte，0 代表尚未作答。
+
+    專案、對象、大項目、子項目字串不存在這裡，提交時才和問卷定義一起展開成長格式。
+    """
+    __slots__ = ("n_pages", "n_questions", "_scores", "_dirty")
+
+    def __init__(self, n_pages, n_questions):
+        self.n_pages = n_pages
+        self.n_questions = n_questions
+        self._scores = bytearray(n_pages * n_questions)
+        self._dirty = set()  # 上次 take_dirty() 之後改過的格子，草稿只寫這些
+
+    def get(self, page, qi):
+        return self._scores[page * self.n_questions + qi] or None
+
+    def set(self, page, qi, score):
+        # 重複作答直接覆寫同一格；None 代表清除
+        i = page * self.n_questions + qi
+        if self._scores[i] != (score or 0):
+            self._scores[i] = score or 0
+            self._dirty.add(i)
+
+    def take_dirty(self):
+        """回傳並清空變更過的 (格子索引, 分數)。"""
+        cells = [(i, self._scores[i]) for i in sorted(self._dirty)]
+        self._dirty.clear()
+        return cells
+
+    def cells(self):
+        return [(i, s) for i, s in enumerate(self._scores) if s]
+
+    def load(self, cells):
+        # 從草稿還原，不算新的變更
+        for i, score in cells:
+            if 0 <= i < len(self._scores) and 0 <= score <= 10:
+                self._scores[i] = score
+
+    def page_scores(self, page):
+        start = page * self.n_questions
+        return [s or None for s in self._scores[start:start + self.n_questions]]
+
+    def missing(self, page):
+        return [qi for qi, s in enumerate(self.page_scores(page)) if s is None]
+
+    def answered(self, page):
+        return self.n_questions - len(self.missing(page))
+
+    def rows(self, user, pairs, items):
+        """展開成與 results.csv 相同的長格式列（不含填寫時間）。"""
+        for page, (proj, target) in enumerate(pairs):
+            for qi, (cat, q) in enumerate(items):
+                yield {
+                    "填答者": user,
+                    "專案": proj,
+                    "被評者": target,
+                    "大項目": cat,
+                    "子項目": q["子項目"],
+                    "分數": self.get(page, qi),
+                }
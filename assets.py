@@ -0,0 +1,37 @@
+import hashlib
+import io
+import os
+from functools import lru_cache
+
+from PIL import Image
+
+
+# ---------------------------
+# 側邊欄等小圖：依顯示寬度縮圖並重新壓縮，整個 process 共用
+# ---------------------------
+_renditions = {}  # (內容 sha1, 寬度) -> WebP bytes
+
+
+def _render(data, width):
+    img = Image.open(io.BytesIO(data))
+    img.thumbnail((width, width * 10), Image.LANCZOS)
+    out = io.BytesIO()
+    img.save(out, "WEBP", quality=85, method=6)
+    return out.getvalue()
+
+
+@lru_cache(maxsize=32)
+def _load(path, mtime_ns, size, width):
+    with open(path, "rb") as f:
+        data = f.read()
+    # 以內容 hash 為 key，檔案被 touch 或換路徑但內容相同時不必重新壓縮
+    key = (hashlib.sha1(data).hexdigest(), width)
+    if key not in _renditions:
+        _renditions[key] = _render(data, width)
+    return _renditions[key]
+
+
+def thumbnail(path, width):
+    """回傳 path 縮至 width 像素寬的 WebP bytes；原檔未變更時不再讀檔或重新壓縮。"""
+    st_ = os.stat(path)
+    return _load(path, st_.st_mtime_ns, st_.st_size, width)
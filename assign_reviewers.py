@@ -0,0 +1,261 @@
+"""由專案成員自動產生互評名單。
+
+輸入的成員表每列一人、每個專案一欄，有標記代表是該專案成員（也可直接給現有的
+互評名單，成員取自有標記的填答者與被評者）。每位成員在每個專案由至少
+--min-reviewers 位同專案成員評分、不評自己，每位評分者的評分份數不超過上限並盡量平均。
+
+先在每個專案內以環狀順序指派，超過上限的人把份數轉給同專案份數最少的同事，
+補不滿的再以增廣路徑（把已指派的評分挪給其他仍有餘裕的同事）補齊。輸出格式與
+互評名單_*.xlsx 相同，可直接給 form_app.py 使用。
+
+    python assign_reviewers.py data/專案成員.xlsx data/互評名單_2025Q3問卷.xlsx --min-reviewers 3
+"""
+import argparse
+import math
+import time
+
+import numpy as np
+import pandas as pd
+
+
+# ---------------------------
+# 讀取專案成員
+# ---------------------------
+def load_membership(df):
+    """回傳 {專案: [成員, ...]}，成員依表中出現順序。"""
+    df = df.dropna(how="all", axis=1).dropna(how="all", axis=0)
+    roster_format = {"填答者", "被評者"} <= set(df.columns)
+    name_cols = ["填答者", "被評者"] if roster_format else [df.columns[0]]
+    project_cols = [c for c in df.columns if c not in name_cols]
+    membership = {}
+    for proj in project_cols:
+        marks = df[proj]
+        mask = marks.notna()
+        if not pd.api.types.is_numeric_dtype(marks):
+            mask &= marks.astype(str).str.strip().ne("")
+        names = pd.unique(df.loc[mask, name_cols].to_numpy().ravel())
+        membership[proj] = [n for n in names if pd.notna(n)]
+    return membership
+
+
+# ---------------------------
+# 指派：容量上限的二分圖 b-matching
+# ---------------------------
+class Assignment:
+    def __init__(self, membership, min_reviewers):
+        self.projects = list(membership)
+        self.people = list(dict.fromkeys(n for members in membership.values() for n in members))
+        index = {name: i for i, name in enumerate(self.people)}
+        self.members = [np.asarray([index[n] for n in membership[p]], dtype=np.int64) for p in self.projects]
+        self._member_lists = [m.tolist() for m in self.members]  # 增廣搜尋時逐一走訪，用 Python int 較快
+
+        # 每個 (被評者, 專案) 一個 slot，需要 need 位不同的評分者
+        slot_person, slot_project, need = [], [], []
+        for pi, members in enumerate(self.members):
+            for e in members:
+                slot_person.append(e)
+                slot_project.append(pi)
+                need.append(min(min_reviewers, len(members) - 1))
+        self.project_slots = np.split(np.arange(len(need)), np.cumsum([len(m) for m in self.members])[:-1])
+        self.slot_person = np.asarray(slot_person, dtype=np.int64)
+        self.slot_project = np.asarray(slot_project, dtype=np.int64)
+        self.need = np.asarray(need, dtype=np.int64)
+        self.shortfall = int(sum(min_reviewers - n for n in need if n < min_reviewers))
+
+        self.loads = np.zeros(len(self.people), dtype=np.int64)
+        self.assigned = [set() for _ in slot_person]       # slot -> 評分者
+        self.reviewer_slots = [set() for _ in self.people]  # 評分者 -> slot
+
+    def _give(self, s, r):
+        self.assigned[s].add(r)
+        self.reviewer_slots[r].add(s)
+
+    def _take(self, s, r):
+        self.assigned[s].discard(r)
+        self.reviewer_slots[r].discard(s)
+
+    def greedy(self, cap, rng):
+        """初始指派：每個專案的成員隨機排成一圈，每人先由後面幾位同事評。
+
+        此時每個 slot 都剛好補滿、同專案內每人評的份數相同；超過上限的人再把手上
+        大專案的份數轉給同專案份數最少的同事，還轉不掉的直接放掉，留給增廣路徑補。
+        """
+        for pi, members in enumerate(self.members):
+            ring = rng.permutation(members).tolist()
+            pos = {r: i for i, r in enumerate(ring)}
+            for s in self.project_slots[pi]:
+                start = pos[self.slot_person[s]]
+                for step in range(1, self.need[s] + 1):
+                    self._give(s, ring[(start + step) % len(ring)])
+        self.loads[:] = [len(slots) for slots in self.reviewer_slots]
+
+        for r in np.argsort(-self.loads, kind="stable"):
+            if self.loads[r] <= cap:
+                break
+            for s in sorted(self.reviewer_slots[r], key=lambda s: -len(self.members[self.slot_project[s]])):
+                if self.loads[r] <= cap:
+                    break
+                members = self.members[self.slot_project[s]]
+                ok = (self.loads[members] < cap) & (members != self.slot_person[s])
+                ok &= ~np.isin(members, list(self.assigned[s]))
+                if ok.any():
+                    cand = members[ok]
+                    r2 = cand[np.argmin(self.loads[cand])]
+                    self._give(s, r2)
+                    self.loads[r2] += 1
+                self._take(s, r)
+                self.loads[r] -= 1
+
+    def _phase(self, cap):
+        """一輪 Dinic 增廣：source→slot（need）→可評的同專案成員（1）→sink（cap）的殘餘圖。
+
+        分層 BFS 從缺評分的 slot 出發：slot 走到同專案、不是本人也還沒評它的成員；份數已滿的
+        成員再沿反向邊走回他手上的 slot（把那份交給別人）。走到有餘裕的成員即為增廣路徑。
+        BFS 逐個 slot 掃描，每個專案保留一份尚未走到的成員名單，每個 slot 只需掃過新走到的成員
+        與少數被它排除的人。之後以 DFS 在分層圖上找一組路徑（走不通的 slot 與成員本輪不再嘗試）。
+        回傳這一輪補上的評分數；回傳 0 代表已沒有增廣路徑，也就是已達最大流。
+        """
+        slot_person, slot_project, assigned = self.slot_person, self.slot_project, self.assigned
+        short = [s for s in range(len(self.need)) if len(assigned[s]) < self.need[s]]
+        level = dict.fromkeys(short, 0)   # slot -> 層
+        dist = {}                         # 評分者 -> 層
+        unseen = {}                       # 專案 -> 尚未走到的成員
+        reached = {}                      # (專案, slot 的層) -> 由該層 slot 走到的成員
+
+        frontier, d = short, 0
+        while frontier:
+            new = []
+            for s in frontier:
+                pi, e, taken = int(slot_project[s]), slot_person[s], assigned[s]
+                keep = []
+                for r in unseen.get(pi, self._member_lists[pi]):
+                    if r in dist:
+                        continue
+                    if r == e or r in taken:
+                        keep.append(r)  # 只是不能評這個 slot，同專案的其他 slot 仍可能走到
+                        continue
+                    dist[r] = d + 1
+                    new.append(r)
+                    reached.setdefault((pi, d), []).append(r)
+                unseen[pi] = keep
+            if any(self.loads[r] < cap for r in new):
+                break
+            frontier = []
+            for r in new:
+                for s2 in self.reviewer_slots[r]:
+                    if s2 not in level:
+                        level[s2] = d + 1
+                        frontier.append(s2)
+            d += 1
+        else:
+            return 0
+
+        dead, used = set(), set()
+
+        def options(s):
+            # slot s 在分層圖上的下一步：(有餘裕的成員, None) 或 (份數已滿的成員, 他要交出的 slot)
+            d = level[s]
+            e, taken = slot_person[s], assigned[s]
+            for r in reached.get((int(slot_project[s]), d), ()):
+                if r in dead or r == e or r in taken:
+                    continue
+                if self.loads[r] < cap:
+                    yield r, None
+                    continue
+                for s2 in list(self.reviewer_slots[r]):
+                    if level.get(s2) == d + 1 and s2 not in used:
+                        used.add(s2)
+                        yield r, s2
+                dead.add(r)
+
+        def augment(s0):
+            # 迭代式 DFS，路徑可能很長，不用遞迴
+            stack, via = [(s0, options(s0))], []
+            while stack:
+                nxt = next(stack[-1][1], None)
+                if nxt is None:
+                    stack.pop()
+                    if via:
+                        via.pop()
+                    continue
+                r, s2 = nxt
+                if s2 is not None:
+                    via.append(r)
+                    stack.append((s2, options(s2)))
+                    continue
+                # 沿路每位評分者接下前一個 slot、交出下一個 slot，最後一位份數 +1
+                slots, reviewers = [s for s, _ in stack], via + [r]
+                for i, (s, rr) in enumerate(zip(slots, reviewers)):
+                    if i + 1 < len(slots):
+                        self._take(slots[i + 1], rr)
+                    self._give(s, rr)
+                    dead.add(rr)
+                self.loads[r] += 1
+                return True
+            return False
+
+        filled = 0
+        for s0 in short:
+            while len(assigned[s0]) < self.need[s0] and augment(s0):
+                filled += 1
+        return filled
+
+    def fill(self, cap):
+        """反覆增廣到補不上為止，回傳仍缺的評分數。"""
+        while self._phase(cap):
+            pass
+        return int(sum(n - len(a) for n, a in zip(self.need, self.assigned)))
+
+
+def assign(membership, min_reviewers=3, max_per_reviewer=None, seed=0):
+    """回傳 (Assignment, 使用的份數上限, 仍缺的評分數)。
+
+    未指定上限時從平均份數的下限開始，補不滿才逐次放寬 1 份。
+    """
+    a = Assignment(membership, min_reviewers)
+    cap = max_per_reviewer or max(1, math.ceil(a.need.sum() / max(1, len(a.people))))
+    a.greedy(cap, np.random.default_rng(seed))
+    missing = a.fill(cap)
+    while missing and max_per_reviewer is None and cap < a.need.sum():
+        cap += 1
+        missing = a.fill(cap)
+    return a, cap, missing
+
+
+def to_roster(a):
+    """轉成互評名單格式：填答者欄為被評者、被評者欄為評分者（與 form_app.py 讀法一致）。"""
+    pairs = {}
+    for s, reviewers in enumerate(a.assigned):
+        e, p = a.slot_person[s], a.slot_project[s]
+        for r in reviewers:
+            pairs.setdefault((e, r), set()).add(p)
+    rows = sorted(pairs)
+    marks = np.full((len(rows), len(a.projects)), np.nan)
+    for i, key in enumerate(rows):
+        marks[i, list(pairs[key])] = 1.0
+    df = pd.DataFrame(marks, columns=a.projects)
+    df.insert(0, "被評者", [a.people[r] for _, r in rows])
+    df.insert(0, "填答者", [a.people[e] for e, _ in rows])
+    return df
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("members", help="專案成員表（或既有的互評名單）.xlsx")
+    parser.add_argument("out", help="輸出的互評名單 .xlsx")
+    parser.add_argument("--min-reviewers", type=int, default=3, help="每人每個專案至少幾位評分者")
+    parser.add_argument("--max-per-reviewer", type=int, help="每位評分者最多評幾份，預設自動取最小可行值")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    membership = load_membership(pd.read_excel(args.members))
+    a, cap, missing = assign(membership, args.min_reviewers, args.max_per_reviewer, args.seed)
+    roster = to_roster(a)
+    roster.to_excel(args.out, index=False)
+    print(f"{len(a.people)} 人、{len(a.projects)} 個專案，產生 {len(roster)} 列（{time.perf_counter() - t0:.1f}s）")
+    print(f"每位評分者 {a.loads.min()}–{a.loads.max()} 份（上限 {cap}）")
+    if a.shortfall:
+        print(f"⚠️ 部分專案成員太少，無法達到每人 {args.min_reviewers} 位評分者，共少 {a.shortfall} 位")
+    if missing:
+        print(f"⚠️ 在上限 {cap} 份內仍有 {missing} 個評分無法指派，請提高 --max-per-reviewer")
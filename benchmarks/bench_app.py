@@ -0,0 +1,106 @@
+"""form_app.py 無頭 rerun 計時（Streamlit AppTest），回報 p50/p95。
+
+在暫存目錄產生合成的評分項目、互評名單與歷史結果，逐一模擬填答者
+選身分 → 逐題點分數 → 換頁 → 提交，量測每個動作的 rerun 延遲。
+
+    python -m benchmarks.bench_app
+    python -m benchmarks.bench_app --people 200 --projects 30 --items 6 --history 200000 --respondents 5
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+import numpy as np
+
+import submit_queue
+from benchmarks.synthetic import REPO_ROOT, write_survey_dir
+from survey_loader import build_review_map
+
+APP = os.path.join(REPO_ROOT, "form_app.py")
+
+
+@contextmanager
+def chdir(path):
+    prev = os.getcwd()
+    os.chdir(path)
+    try:
+        yield
+    finally:
+        os.chdir(prev)
+
+
+class Timings:
+    def __init__(self):
+        self.samples = defaultdict(list)
+
+    def timed(self, name, fn):
+        t0 = time.perf_counter()
+        result = fn()
+        self.samples[name].append(time.perf_counter() - t0)
+        return result
+
+    def report(self, file=sys.stdout):
+        print(f"{'動作':<10} {'次數':>6} {'p50(ms)':>10} {'p95(ms)':>10} {'max(ms)':>10}", file=file)
+        for name, xs in self.samples.items():
+            ms = np.asarray(xs) * 1000
+            print(f"{name:<10} {len(ms):>8} {np.percentile(ms, 50):>10.1f} {np.percentile(ms, 95):>10.1f} "
+                  f"{ms.max():>10.1f}", file=file)
+
+
+def run_respondent(user, timings):
+    """走完一位填答者的完整流程，每個動作的 rerun 時間記入 timings。"""
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(APP, default_timeout=120)
+    timings.timed("首次載入", at.run)
+    timings.timed("選擇身分", at.selectbox[0].select(user).run)
+
+    while True:
+        for btn in [b for b in at.button if b.key and b.key.startswith("btn_") and b.key.endswith("_7")]:
+            timings.timed("點選分數", btn.click().run)
+        labels = {b.label: b for b in at.button}
+        if "✅ 完成填寫" in labels:
+            timings.timed("提交", labels["✅ 完成填寫"].click().run)
+            break
+        if "➡️ 下一位" not in labels:
+            break  # 已提交過（例如同一人另開的 session），畫面只剩感謝頁
+        timings.timed("換頁", labels["➡️ 下一位"].click().run)
+    return at
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--people", type=int, default=50)
+    parser.add_argument("--projects", type=int, default=10)
+    parser.add_argument("--density", type=float, default=0.1)
+    parser.add_argument("--categories", type=int, default=3)
+    parser.add_argument("--items", type=int, default=5, help="每個大項目的子項目數")
+    parser.add_argument("--history", type=int, default=10_000, help="既有 results.csv 筆數")
+    parser.add_argument("--respondents", type=int, default=3)
+    parser.add_argument("--storage", choices=["csv", "sqlite", "parquet"], default="csv")
+    args = parser.parse_args()
+
+    # AppTest 無法操作自訂元件，計時一律用原生按鈕模式
+    os.environ["SURVEY_SCORE_INPUT"] = "buttons"
+    os.environ["SURVEY_STORAGE"] = args.storage
+    sys.path.insert(0, REPO_ROOT)
+
+    with tempfile.TemporaryDirectory() as tmp, chdir(tmp):
+        roster, _ = write_survey_dir("data", args.people, args.projects, args.density,
+                                     args.categories, args.items, args.history)
+        respondents = list(build_review_map(roster))[:args.respondents]
+        print(f"名單 {len(roster)} 列 × {args.projects} 專案，題目 {args.categories * args.items} 題，"
+              f"歷史結果 {args.history} 筆，模擬 {len(respondents)} 位填答者（{args.storage}）")
+        timings = Timings()
+        for user in respondents:
+            run_respondent(user, timings)
+        submit_queue.flush_all()  # 背景寫入 thread 寫完才離開暫存目錄
+        timings.report()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""互評名單自動產生：計時，並與獨立實作的最大流比對缺額。
+
+合成的專案大小呈長尾分布、每人參與數個專案。對每個上限 cap，assign_reviewers 的
+fill() 仍缺的評分數必須等於 source→slot(need)→可評成員(1)→sink(cap) 這張圖的最大流缺額。
+
+    python -m benchmarks.bench_assign
+    python -m benchmarks.bench_assign --people 3000 --projects 300 --caps 5 6 7 --no-check
+"""
+import argparse
+import time
+from collections import deque
+
+import numpy as np
+
+from assign_reviewers import Assignment, assign
+
+
+def make_membership(n_people, n_projects, min_size=2, seed=0):
+    """專案大小依 Pareto 分布（少數大專案、多數小專案），成員隨機抽。"""
+    rng = np.random.default_rng(seed)
+    sizes = np.clip((rng.pareto(1.2, n_projects) + 1) * min_size, min_size, n_people).astype(int)
+    people = [f"員工{i:05d}" for i in range(n_people)]
+    return {f"專案{j:04d}": [people[i] for i in rng.choice(n_people, size, replace=False)]
+            for j, size in enumerate(sizes)}
+
+
+def reference_missing(a, cap):
+    """以明確建出的圖跑 Dinic，回傳總需求減最大流；與 Assignment 的增廣搜尋完全獨立。"""
+    n_slots, n_people = len(a.need), len(a.people)
+    source, sink = n_slots + n_people, n_slots + n_people + 1
+    head, to, capacity = [[] for _ in range(sink + 1)], [], []
+
+    def edge(u, v, c):
+        head[u].append(len(to)); to.append(v); capacity.append(c)
+        head[v].append(len(to)); to.append(u); capacity.append(0)
+
+    for s in range(n_slots):
+        edge(source, s, int(a.need[s]))
+        for r in a.members[a.slot_project[s]]:
+            if r != a.slot_person[s]:
+                edge(s, n_slots + int(r), 1)
+    for r in range(n_people):
+        edge(n_slots + r, sink, cap)
+
+    flow = 0
+    while True:
+        level = [-1] * (sink + 1)
+        level[source] = 0
+        queue = deque([source])
+        while queue:
+            u = queue.popleft()
+            for e in head[u]:
+                if capacity[e] and level[to[e]] < 0:
+                    level[to[e]] = level[u] + 1
+                    queue.append(to[e])
+        if level[sink] < 0:
+            return int(a.need.sum()) - flow
+        ptr = [0] * (sink + 1)
+        while True:
+            # 迭代式 DFS 找一條分層路徑，沿途推 1 單位
+            path, u = [], source
+            while u != sink:
+                while ptr[u] < len(head[u]):
+                    e = head[u][ptr[u]]
+                    if capacity[e] and level[to[e]] == level[u] + 1:
+                        break
+                    ptr[u] += 1
+                else:
+                    if not path:
+                        break
+                    level[u] = -1  # 死路
+                    u = to[path.pop() ^ 1]
+                    continue
+                path.append(e)
+                u = to[e]
+            if u != sink:
+                break
+            for e in path:
+                capacity[e] -= 1
+                capacity[e ^ 1] += 1
+            flow += 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--people", type=int, default=600)
+    parser.add_argument("--projects", type=int, default=80)
+    parser.add_argument("--min-reviewers", type=int, default=3)
+    parser.add_argument("--caps", type=int, nargs="+", help="要比對的上限，預設為自動上限附近")
+    parser.add_argument("--seeds", type=int, nargs="+", default=[0, 1, 2])
+    parser.add_argument("--no-check", action="store_true", help="只計時，不跑參考最大流")
+    args = parser.parse_args()
+
+    print(f"{'seed':>4} {'cap':>4} {'需求':>7} {'缺額':>6} {'參考':>6} {'fill(s)':>8}")
+    for seed in args.seeds:
+        membership = make_membership(args.people, args.projects, seed=seed)
+        t0 = time.perf_counter()
+        _, auto_cap, auto_missing = assign(membership, args.min_reviewers, seed=seed)
+        print(f"{seed:>4} 自動上限 {auto_cap}（缺 {auto_missing}），{time.perf_counter() - t0:.2f}s")
+        for cap in args.caps or [auto_cap - 2, auto_cap - 1, auto_cap]:
+            if cap < 1:
+                continue
+            a = Assignment(membership, args.min_reviewers)
+            t0 = time.perf_counter()
+            a.greedy(cap, np.random.default_rng(seed))
+            missing = a.fill(cap)
+            elapsed = time.perf_counter() - t0
+            assert (a.loads <= cap).all() and all(a.slot_person[s] not in r for s, r in enumerate(a.assigned))
+            ref = "-" if args.no_check else reference_missing(a, cap)
+            print(f"{seed:>4} {cap:>4} {int(a.need.sum()):>9} {missing:>8} {ref!s:>8} {elapsed:>8.2f}")
+            assert ref == "-" or missing == ref, f"fill() 缺 {missing}，最大流只缺 {ref}"
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""互評名單解析：原本的逐列迴圈 vs 向量化版本。
+
+    python -m benchmarks.bench_roster
+    python -m benchmarks.bench_roster --sizes 1000x100 5000x300 --repeat 3
+"""
+import argparse
+import time
+from collections import defaultdict
+
+import pandas as pd
+
+from benchmarks.synthetic import make_roster
+from survey_loader import build_review_map
+
+
+def legacy_build_review_map(people_df):
+    # 原 form_app.py 的寫法：iterrows() × 每個專案欄
+    project_cols = people_df.columns[2:]
+    review_map = defaultdict(lambda: defaultdict(list))
+    for _, row in people_df.iterrows():
+        reviewer = row["被評者"]
+        reviewee = row["填答者"]
+        for proj in project_cols:
+            if pd.notna(row[proj]) and str(row[proj]).strip():
+                review_map[reviewer][proj].append(reviewee)
+    return review_map
+
+
+def best_of(fn, arg, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn(arg)
+        best = min(best, time.perf_counter() - t0)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", nargs="+", default=["100x20", "500x50", "2000x100"],
+                        help="人數x專案數")
+    parser.add_argument("--density", type=float, default=0.05)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'人數':>6} {'專案':>5} {'列數':>7} {'標記':>8} {'legacy(s)':>10} {'vector(s)':>10} {'加速':>7}")
+    for size in args.sizes:
+        n_people, n_projects = map(int, size.split("x"))
+        df = make_roster(n_people, n_projects, args.density)
+        t_new, new = best_of(build_review_map, df, args.repeat)
+        t_old, old = best_of(legacy_build_review_map, df, 1 if len(df) * n_projects > 1_000_000 else args.repeat)
+        assert {r: {p: tuple(t) for p, t in projs.items()} for r, projs in old.items()} == \
+               {r: dict(projs) for r, projs in new.items()}, "兩種解析結果不一致"
+        marks = sum(len(t) for projs in new.values() for t in projs.values())
+        print(f"{n_people:>8} {n_projects:>7} {len(df):>9} {marks:>10} {t_old:>10.3f} {t_new:>10.3f} {t_old / t_new:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
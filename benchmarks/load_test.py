@@ -0,0 +1,126 @@
+"""多位填答者同時作答的負載測試。
+
+以 --concurrency 個 process 各自跑 Streamlit AppTest session（等同多個 Streamlit
+worker 共用同一份結果儲存），每位填答者走完選身分 → 逐題評分 → 換頁 → 提交。
+結束後回報吞吐量、延遲 p50/p95/p99、每個 session 的記憶體增量，並檢查結果
+儲存中沒有遺失或重複的列。
+
+    python -m benchmarks.load_test --respondents 40 --concurrency 8
+    python -m benchmarks.load_test --respondents 20 --concurrency 8 --double --storage sqlite
+"""
+import argparse
+import os
+import resource
+import sys
+import tempfile
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from benchmarks.bench_app import Timings, chdir, run_respondent
+from benchmarks.synthetic import REPO_ROOT, write_survey_dir
+import submit_queue
+import surveys
+from survey_loader import build_review_map, parse_questions
+
+
+def rss_kb():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") // 1024
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def _init_worker(workdir, storage):
+    os.chdir(workdir)
+    os.environ["SURVEY_SCORE_INPUT"] = "buttons"
+    os.environ["SURVEY_STORAGE"] = storage
+    sys.path.insert(0, REPO_ROOT)
+
+
+def _run_batch(users):
+    timings = Timings()
+    before = rss_kb()
+    sessions = [run_respondent(user, timings) for user in users]  # 保留 session 以量測常駐記憶體
+    grown = rss_kb() - before
+    submit_queue.flush_all()  # 背景寫入 thread 清空後才回報，驗證時結果才完整
+    return dict(timings.samples), grown, len(sessions)
+
+
+def open_results(storage):
+    # 與 form_app.py 未指定 ?survey= 時相同的預設問卷
+    return surveys.get(surveys.DEFAULT_SURVEY).open_store(storage)
+
+
+def verify(storage, review_map, questions, users):
+    """比對預期列與實際寫入的列：遺失、重複、名單外。"""
+    expected = Counter(
+        (user, proj, target, q["子項目"])
+        for user in users
+        for proj, targets in review_map[user].items()
+        for target in targets
+        for qlist in questions.values()
+        for q in qlist
+    )
+    df = open_results(storage).query()
+    actual = Counter(zip(df["填答者"], df["專案"], df["被評者"], df["子項目"]))
+    missing = sum((expected - actual).values())
+    extra = sum((actual - expected).values())
+    return len(df), sum(expected.values()), missing, extra
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--respondents", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--people", type=int, default=60)
+    parser.add_argument("--projects", type=int, default=10)
+    parser.add_argument("--density", type=float, default=0.03)
+    parser.add_argument("--items", type=int, default=5, help="每個大項目的子項目數")
+    parser.add_argument("--storage", choices=["csv", "sqlite", "parquet"], default="csv")
+    parser.add_argument("--double", action="store_true",
+                        help="每位填答者同時開兩個 session 提交，檢查一人一次的保證")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        with chdir(tmp):
+            roster, questions_df = write_survey_dir("data", args.people, args.projects, args.density,
+                                                    items_per_category=args.items)
+        review_map = build_review_map(roster)
+        questions = parse_questions(questions_df)
+        users = list(review_map)[:args.respondents]
+        # --double 時同一人的兩個 session 相鄰排列，會分到不同 worker 同時進行
+        jobs = [user for user in users for _ in range(2 if args.double else 1)]
+        batches = [jobs[i::args.concurrency] for i in range(args.concurrency) if jobs[i::args.concurrency]]
+        print(f"{len(users)} 位填答者、{len(jobs)} 個 session、{len(batches)} 個並行 worker（{args.storage}）")
+
+        t0 = time.perf_counter()
+        with ProcessPoolExecutor(len(batches), initializer=_init_worker, initargs=(tmp, args.storage)) as ex:
+            outputs = list(ex.map(_run_batch, batches))
+        wall = time.perf_counter() - t0
+
+        timings = Timings()
+        for samples, _, _ in outputs:
+            for name, xs in samples.items():
+                timings.samples[name].extend(xs)
+        timings.report()
+
+        all_ms = np.concatenate([np.asarray(xs) for xs in timings.samples.values()]) * 1000
+        per_session_kb = [grown / n for _, grown, n in outputs if n]
+        print(f"\n總耗時 {wall:.1f}s，吞吐量 {len(jobs) / wall:.2f} session/s、{len(all_ms) / wall:.1f} rerun/s")
+        print(f"全部 rerun 延遲 p50 {np.percentile(all_ms, 50):.0f}ms、p95 {np.percentile(all_ms, 95):.0f}ms、"
+              f"p99 {np.percentile(all_ms, 99):.0f}ms")
+        print(f"每個 session 常駐記憶體約 {np.mean(per_session_kb) / 1024:.1f} MB")
+
+        with chdir(tmp):
+            n_rows, n_expected, missing, extra = verify(args.storage, review_map, questions, users)
+        print(f"\n結果列數 {n_rows}（預期 {n_expected}）：遺失 {missing}、重複或多餘 {extra}")
+        if missing or extra:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+# ---------------------------
+# 合成互評名單：與 互評名單_*.xlsx 相同格式（填答者、被評者、各專案欄）
+# ---------------------------
+def make_roster(n_people, n_projects, density=0.05, seed=0):
+    rng = np.random.default_rng(seed)
+    people = np.array([f"員工{i:05d}" for i in range(n_people)], dtype=object)
+    projects = [f"專案{j:04d}" for j in range(n_projects)]
+
+    # 每位被評者只和少數幾位同事配對，避免 n_people² 列
+    pairs_per_person = max(1, min(n_people, 8))
+    reviewees = np.repeat(people, pairs_per_person)
+    reviewers = rng.choice(people, size=len(reviewees))
+    marks = np.where(rng.random((len(reviewees), n_projects)) < density, 1.0, np.nan)
+
+    df = pd.DataFrame(marks, columns=projects)
+    df.insert(0, "被評者", reviewers)
+    df.insert(0, "填答者", reviewees)
+    return df
+
+
+# ---------------------------
+# 合成評分項目：與 評分項目_*.xlsx 相同格式（大項目只寫在每組第一列）
+# ---------------------------
+def make_questions(n_categories=3, items_per_category=5):
+    rows = []
+    for c in range(n_categories):
+        for i in range(items_per_category):
+            rows.append({
+                "大項目": f"大項目{c:02d}" if i == 0 else np.nan,
+                "子項目": f"子項目{c:02d}-{i:02d}",
+                "說明": f"第 {c} 類第 {i} 題的說明文字",
+            })
+    return pd.DataFrame(rows, columns=["大項目", "子項目", "說明"])
+
+
+# ---------------------------
+# 合成歷史結果：與 results.csv 相同的長格式
+# ---------------------------
+def make_results(n_rows, roster_df, questions_df, seed=0):
+    rng = np.random.default_rng(seed)
+    people = pd.unique(roster_df[["填答者", "被評者"]].to_numpy().ravel())
+    projects = np.asarray(roster_df.columns[2:], dtype=object)
+    items = questions_df.assign(大項目=questions_df["大項目"].ffill())
+    pick = rng.integers(0, len(items), n_rows)
+    return pd.DataFrame({
+        "填答者": rng.choice(people, n_rows),
+        "專案": rng.choice(projects, n_rows),
+        "被評者": rng.choice(people, n_rows),
+        "大項目": items["大項目"].to_numpy()[pick],
+        "子項目": items["子項目"].to_numpy()[pick],
+        "分數": rng.integers(1, 11, n_rows),
+        "填寫時間": "2025-01-01 00:00:00",
+    })
+
+
+def write_survey_dir(data_dir, n_people=50, n_projects=10, density=0.1,
+                     n_categories=3, items_per_category=5, n_history=0, seed=0,
+                     image=os.path.join(REPO_ROOT, "data", "DUN_吉卜力.png")):
+    """在 data_dir 產生 form_app.py 讀取的整組檔案，回傳 (roster_df, questions_df)。"""
+    os.makedirs(data_dir, exist_ok=True)
+    roster = make_roster(n_people, n_projects, density, seed)
+    questions = make_questions(n_categories, items_per_category)
+    questions.to_excel(os.path.join(data_dir, "評分項目_2025Q1問卷.xlsx"), index=False)
+    roster.to_excel(os.path.join(data_dir, "互評名單_2025Q1問卷.xlsx"), index=False)
+    if n_history:
+        make_results(n_history, roster, questions, seed).to_csv(os.path.join(data_dir, "results.csv"), index=False)
+    if image and os.path.exists(image):
+        shutil.copy(image, os.path.join(data_dir, os.path.basename(image)))
+    return roster, questions
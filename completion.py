@@ -0,0 +1,50 @@
+import threading
+
+import pandas as pd
+
+
+# ---------------------------
+# 填答進度索引：名單一次建好，之後每筆提交只做 O(該人參與專案數) 的更新
+# ---------------------------
+class CompletionIndex:
+    def __init__(self, review_map):
+        self.projects_of = {user: tuple(projs) for user, projs in review_map.items()}
+        self.total_by_project = {}
+        for projs in self.projects_of.values():
+            for proj in projs:
+                self.total_by_project[proj] = self.total_by_project.get(proj, 0) + 1
+        self.done_by_project = dict.fromkeys(self.total_by_project, 0)
+        self.submitted = set()
+        self.cursor = None
+        self._lock = threading.Lock()
+
+    def mark_submitted(self, user):
+        # 名單外（例如舊問卷留下）或重複的提交不列入
+        if user in self.submitted or user not in self.projects_of:
+            return
+        self.submitted.add(user)
+        for proj in self.projects_of[user]:
+            self.done_by_project[proj] += 1
+
+    def refresh(self, store):
+        """只讀取上次之後新增的提交紀錄。"""
+        with self._lock:
+            users, self.cursor = store.submitted_since(self.cursor)
+            for user in users:
+                self.mark_submitted(user)
+
+    def overall(self):
+        return len(self.submitted), len(self.projects_of)
+
+    def by_project(self):
+        df = pd.DataFrame({
+            "專案": list(self.total_by_project),
+            "已填": [self.done_by_project[p] for p in self.total_by_project],
+            "應填": list(self.total_by_project.values()),
+        })
+        df["填答率"] = df["已填"] / df["應填"]
+        return df
+
+    def pending(self, project=None):
+        return [user for user, projs in self.projects_of.items()
+                if user not in self.submitted and (project is None or project in projs)]
@@ -1,96 +1,70 @@
-import streamlit as st
-import pandas as pd
+import io
 import os
-from collections import defaultdict
 
-st.set_page_config(page_title="部門互評問卷", layout="wide")
-st.title("📋 部門互評問卷 - 使用者填寫介面")
+import pandas as pd
+import streamlit as st
+
+import surveys
+from survey_loader import compile_survey, content_hash, save_bundle, validate
+
+st.set_page_config(page_title="問卷設定工具", layout="wide")
+st.title("🛠️ 部門互評問卷 - 設定工具")
 
 # ---------------------------
-# 讀取設定檔（由管理者上傳）
+# 上傳設定檔：檢查 → 編譯成問卷包，填答端啟動時直接載入
 # ---------------------------
+code = st.text_input("問卷代號", value="2025Q1", help="檔案會存成 data/評分項目_{代號}問卷.xlsx 等（已註冊的問卷依 surveys.py）")
+q_file = st.file_uploader("評分項目（大項目、子項目、說明）", type=["xlsx"])
+r_file = st.file_uploader("互評名單（填答者、被評者、各專案欄）", type=["xlsx"])
 
-if not os.path.exists("data/評分項目.xlsx") or not os.path.exists("data/互評名單.xlsx"):
-    st.error("⚠️ 尚未設定問卷內容，請聯絡管理者先執行設定工具上傳檔案。")
+if code and not surveys.valid_code(code):
+    st.error("問卷代號不可包含 /、\\ 或 ..")
+    st.stop()
+if not code or q_file is None or r_file is None:
+    st.info("請輸入問卷代號並上傳兩個設定檔")
     st.stop()
 
-questions_df = pd.read_excel("data/評分項目.xlsx")
-people_df = pd.read_excel("data/互評名單.xlsx").dropna(how="all", axis=1).dropna(how="all", axis=0)
-
-# 題目解析
-questions = []
-current_category = ""
-for _, row in questions_df.iterrows():
-    if not pd.isna(row["大項目"]):
-        current_category = row["大項目"]
-    if pd.notna(row["子項目"]):
-        questions.append({
-            "大項目": current_category,
-            "子項目": row["子項目"],
-            "說明": str(row["說明"]).strip()
-        })
-
-# 互評邏輯解析
-projects = people_df.columns[2:]
-reviewer_project_map = defaultdict(lambda: defaultdict(list))
-for i in range(2, people_df.shape[0]):
-    reviewer = people_df.iloc[i, 0]
-    reviewee = people_df.iloc[i, 1]
-    for proj in projects:
-        if people_df.at[i, proj] == 1:
-            reviewer_project_map[reviewer][proj].append(reviewee)
+q_bytes, r_bytes = q_file.getvalue(), r_file.getvalue()
+questions_df = pd.read_excel(io.BytesIO(q_bytes))
+people_df = pd.read_excel(io.BytesIO(r_bytes))
 
-# ---------------------------
-# 問卷主體
-# ---------------------------
-user = st.selectbox("請選擇你的名字", list(reviewer_project_map.keys()))
-projects = list(reviewer_project_map[user].keys())
+errors, warnings = validate(questions_df, people_df)
+for msg in errors:
+    st.error(msg)
+for msg in warnings:
+    st.warning(msg)
+if errors:
+    st.stop()
 
-if "page" not in st.session_state:
-    st.session_state.page = 0
+survey = compile_survey(questions_df, people_df, content_hash(q_bytes, r_bytes))
+n_pairs = sum(len(t) for projs in survey.review_map.values() for t in projs.values())
+n_items = sum(len(qlist) for qlist in survey.questions.values())
 
-curr_project = projects[st.session_state.page]
-review_targets = reviewer_project_map[user][curr_project]
+c1, c2, c3, c4 = st.columns(4)
+c1.metric("大項目", len(survey.questions))
+c2.metric("子項目", n_items)
+c3.metric("填答者", len(survey.review_map))
+c4.metric("評分對象（人次）", n_pairs)
 
-st.header(f"📌 專案：{curr_project}")
+with st.expander("預覽：各填答者的評分對象"):
+    st.dataframe(pd.DataFrame(
+        [(reviewer, proj, "、".join(targets))
+         for reviewer, projs in survey.review_map.items() for proj, targets in projs.items()],
+        columns=["填答者", "專案", "評分對象"],
+    ), hide_index=True)
 
-results = []
-for target in review_targets:
-    st.subheader(f"🎯 評分對象：{target}")
-    for q in questions:
-        st.markdown(f"**{q['大項目']} - {q['子項目']}**")
-        st.caption(q['說明'])
-        cols = st.columns(10)
-        key = f"{curr_project}_{target}_{q['子項目']}"
-        for i in range(10):
-            if cols[i].button(str(i+1), key=f"{key}_{i+1}"):
-                st.session_state[key] = i + 1
-        score = st.session_state.get(key, 5)
-        st.write(f"已選分數：{score}")
-        results.append({
-            "填答者": user,
-            "專案": curr_project,
-            "被評者": target,
-            "大項目": q["大項目"],
-            "子項目": q["子項目"],
-            "分數": score
-        })
+# 已註冊的問卷寫到註冊表指定的檔案，其餘依檔名慣例；與填答端 surveys.get() 讀的是同一組路徑
+config = surveys.REGISTRY.get(code) or surveys.by_convention(code)
+sharing = [c for c, other in surveys.REGISTRY.items()
+           if c != code and other.bundle_path == config.bundle_path]
+if sharing:
+    st.warning(f"此問卷與 {'、'.join(sharing)} 共用題目與名單，發佈後會一併更新")
 
-# ---------------------------
-# 導覽按鈕 / 提交
-# ---------------------------
-col1, col2 = st.columns([1, 5])
-with col1:
-    if st.session_state.page > 0:
-        if st.button("⬅️ 上一頁"):
-            st.session_state.page -= 1
-with col2:
-    if st.session_state.page < len(projects) - 1:
-        if st.button("➡️ 下一頁"):
-            st.session_state.page += 1
-    else:
-        if st.button("✅ 完成填寫"):
-            st.success("所有問卷已完成！")
-            df = pd.DataFrame(results)
-            st.dataframe(df)
-            # df.to_csv("results.csv", index=False)
\ No newline at end of file
+if st.button("📦 發佈問卷", type="primary"):
+    for path, blob in ((config.questions_path, q_bytes), (config.roster_path, r_bytes)):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(blob)
+    # 問卷包最後寫，mtime 不早於 Excel，填答端才會採用
+    save_bundle(survey, config.bundle_path)
+    st.success(f"已發佈 {config.bundle_path}（版本 {survey.version}）")
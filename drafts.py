@@ -0,0 +1,97 @@
+import hashlib
+import os
+import struct
+import time
+
+# ---------------------------
+# 作答草稿：每位填答者一個小檔，只附加變更過的格子，重新進來時自動還原
+# ---------------------------
+# 檔頭：magic、問卷版本、頁數、題數；之後每筆 6 bytes（格子索引, 分數），索引 -1 代表目前頁碼
+_MAGIC = b"SVD1"
+_HEAD = struct.Struct("<4s16sII")
+_RECORD = struct.Struct("<iH")
+_PAGE = -1
+
+
+def draft_path(draft_dir, user):
+    # 檔名用姓名的 hash，避免特殊字元
+    return os.path.join(draft_dir, hashlib.sha1(user.encode("utf-8")).hexdigest()[:16] + ".draft")
+
+
+class Draft:
+    """一位填答者的草稿檔；問卷版本或題目數量不同的舊草稿直接捨棄。"""
+
+    def __init__(self, path, version, n_pages, n_questions, min_interval=2.0):
+        self.path = path
+        self.header = _HEAD.pack(_MAGIC, version.encode("utf-8")[:16], n_pages, n_questions)
+        self.n_cells = n_pages * n_questions
+        self.min_interval = min_interval
+        self._last_sync = 0.0
+        self._unsynced = False
+        self._page = None
+
+    def restore(self, answers):
+        """把草稿載入 answers，回傳 (還原的格數, 頁碼或 None)。"""
+        try:
+            with open(self.path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return 0, None
+        if not data.startswith(self.header):
+            self.discard()
+            return 0, None
+        cells, page = {}, None
+        body = data[_HEAD.size:]
+        for i, value in _RECORD.iter_unpack(body[:len(body) - len(body) % _RECORD.size]):
+            if i == _PAGE:
+                page = value
+            else:
+                cells[i] = value
+        answers.load(cells.items())
+        self._page = page
+        return sum(1 for v in cells.values() if v), page
+
+    def save(self, answers, page, force=False):
+        """附加變更過的格子，每次都寫入（一格 6 bytes）；fsync 至多每 min_interval 秒一次，force 時立即。
+
+        寫入後即在作業系統快取內，分頁關閉或伺服器 process 當掉都不會遺失，只有整台機器斷電時可能少最後幾秒。
+        """
+        cells = answers.take_dirty()
+        if page != self._page:
+            cells.append((_PAGE, page))
+        now = time.monotonic()
+        sync = force or now - self._last_sync >= self.min_interval
+        if not cells and not (sync and self._unsynced):
+            return
+        self._page = page
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        size = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+        if size == 0 or size > _HEAD.size + 4 * self.n_cells * _RECORD.size:
+            # 新檔或反覆修改讓檔案變大：改寫成只含目前分數的快照
+            snapshot = [*answers.cells(), (_PAGE, page)]
+            tmp = f"{self.path}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(self.header + b"".join(_RECORD.pack(i, v) for i, v in snapshot))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.path)
+            self._last_sync, self._unsynced = now, False
+            return
+        with open(self.path, "ab") as f:
+            f.write(b"".join(_RECORD.pack(i, v) for i, v in cells))
+            if sync:
+                f.flush()
+                os.fsync(f.fileno())
+        if sync:
+            self._last_sync = now
+        self._unsynced = not sync
+
+    def discard(self):
+        discard(self.path)
+
+
+def discard(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
@@ -1,10 +1,19 @@
 import streamlit as st
 import pandas as pd
 import os
-from collections import defaultdict
 from datetime import datetime
+import drafts
 import time
 import streamlit.components.v1 as components
+import analytics
+import metrics
+from answer_store import AnswerStore
+from assets import thumbnail
+from score_selector import score_selector
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+from submit_queue import GroupCommitWriter
+from survey_watch import LiveSurvey
+import surveys
 
 # ---------------------------
 # 頁面設定
@@ -38,37 +47,9 @@ st.markdown(
 st.markdown("<a id='top'></a>", unsafe_allow_html=True)
 
 # ---------------------------
-# 自訂樣式與 JavaScript 滾動至頂
+# JavaScript 滾動至頂
 # ---------------------------
 st.markdown("""
-<style>
-.segment-bar {
-    display: flex;
-    gap: 6px;
-    margin: 8px 0;
-}
-.segment-button {
-    flex: 1;
-    padding: 10px 0;
-    text-align: center;
-    border: 1px solid #ccc;
-    border-radius: 4px;
-    cursor: pointer;
-    transition: all 0.2s ease;
-    background-color: #f0f0f0;
-    user-select: none;
-    font-weight: bold;
-    color: black;
-}
-.segment-button:hover {
-    background-color: #e0e0e0;
-}
-.segment-button.selected {
-    background-color: #1f77b4 !important;
-    color: white !important;
-    border: 2px solid #1f77b4;
-}
-</style>
 <script>
 window.scrollTo({ top: 0, behavior: 'smooth' });
 </script>
@@ -80,54 +61,103 @@ window.scrollTo({ top: 0, behavior: 'smooth' });
 state = st.session_state
 if "user" not in state: state.user = None
 if "page" not in state: state.page = 0
-if "answers" not in state: state.answers = []
-if "scores" not in state: state.scores = {}
+if "answers" not in state: state.answers = None
 if "submitted" not in state: state.submitted = False
 if "just_switched_page" not in state: state.just_switched_page = False
+if "survey_version" not in state: state.survey_version = None
+if "draft" not in state: state.draft = None
+
+# ---------------------------
+# 選擇問卷：網址 ?survey=<代號>，未指定時用預設問卷
+# ---------------------------
+survey_code = st.query_params.get("survey", surveys.DEFAULT_SURVEY)
+config = surveys.get(survey_code)
+if config is None:
+    st.error(f"⚠️ 找不到問卷「{survey_code}」，可用的問卷：{'、'.join(surveys.available())}")
+    st.stop()
+if state.get("survey_code") != survey_code:
+    # 同一個分頁切換到另一份問卷時，從選擇身分重新開始
+    state.survey_code = survey_code
+    state.user, state.page, state.answers = None, 0, None
+    state.submitted, state.survey_version, state.draft = False, None, None
+
+# ---------------------------
+# 效能量測：各階段計時、rerun 次數、session_state 大小
+# ---------------------------
+ctx = get_script_run_ctx()
+session_id = ctx.session_id if ctx else None
+metrics.record_rerun(session_id, state)
+# SURVEY_METRICS_FILE 例如 data/metrics_{pid}.prom，未設定則不匯出
+if metrics.EXPORT_FILE:
+    metrics.export_prometheus(metrics.EXPORT_FILE)
 
 # ---------------------------
 # 已提交檢查
 # ---------------------------
-submitted_file = "data/submitted_users.csv"
-submitted_users = pd.read_csv(submitted_file) if os.path.exists(submitted_file) else pd.DataFrame(columns=["填答者"])
+# SURVEY_STORAGE=sqlite 時改用各問卷的 SQLite 檔（WAL），=parquet 時寫入 data/results_parquet，預設沿用 CSV
+STORAGE = os.environ.get("SURVEY_STORAGE", "csv")
+
+
+@st.cache_resource(show_spinner=False)
+def results_store(survey_code, backend):
+    # 每份問卷、每種儲存在整個 process 一個，SQLite 的連線設定與 schema 檢查不必每次 rerun 重做
+    return surveys.get(survey_code).open_store(backend)
+
+
+store = results_store(survey_code, STORAGE)
+# 被評者／專案／子項目的物化彙總，每次提交時增量更新
+aggregates_file = config.aggregates_path
+# SURVEY_WRITER=sync 時在點擊當下直接寫入結果；預設由背景 thread 批次寫入
+WRITER = os.environ.get("SURVEY_WRITER", "queue")
+
+
+@st.cache_resource(show_spinner=False)
+def submission_writer(survey_code, backend):
+    # 每份問卷在整個 process 一個寫入 thread，每批結果與彙總在彙總檔的鎖內一起寫入
+    config, store = surveys.get(survey_code), results_store(survey_code, backend)
+    return GroupCommitWriter(store, config.journal_dir,
+                             commit=lambda rows: analytics.append(config.aggregates_path, store, rows))
+
+
+if WRITER == "queue":
+    # 每份問卷第一次被開啟時就建立寫入器，上次 process 結束時留下的日誌在這時補寫
+    submission_writer(survey_code, STORAGE)
+
+# SURVEY_SCORE_INPUT=buttons 時改回每題 10 個 st.button（每次點選都會 rerun）
+SCORE_INPUT = os.environ.get("SURVEY_SCORE_INPUT", "component")
+# SURVEY_LAYOUT=matrix 時每個專案一頁，以「對象 × 子項目」表格一次填完
+LAYOUT = os.environ.get("SURVEY_LAYOUT", "page")
 
 # ---------------------------
 # 資料讀取與前置處理
 # ---------------------------
-if not os.path.exists("data/評分項目_2025Q1問卷.xlsx") or not os.path.exists("data/互評名單_2025Q1問卷.xlsx"):
+# 設定工具（config_app.py）發佈的問卷包優先；沒有問卷包時才解析 Excel
+if not os.path.exists(config.bundle_path) and not (os.path.exists(config.questions_path)
+                                                   and os.path.exists(config.roster_path)):
     st.error("⚠️ 請先由管理者上傳評分項目與互評名單設定檔")
     st.stop()
 
-questions_df = pd.read_excel("data/評分項目_2025Q1問卷.xlsx")
-people_df    = pd.read_excel("data/互評名單_2025Q1問卷.xlsx")
-
-# 解析題目
-questions = defaultdict(list)
-current_cat = None
-for _, row in questions_df.iterrows():
-    if pd.notna(row["大項目"]):
-        current_cat = row["大項目"]
-    if pd.notna(row["子項目"]):
-        questions[current_cat].append({
-            "子項目": row["子項目"],
-            "說明": str(row["說明"]).strip()
-        })
-
-# 建立 reviewer->project->reviewees 映射
-project_cols = people_df.columns[2:]
-review_map = defaultdict(lambda: defaultdict(list))
-for _, row in people_df.iterrows():
-    reviewer = row["被評者"]
-    reviewee = row["填答者"]
-    for proj in project_cols:
-        if pd.notna(row[proj]) and str(row[proj]).strip():
-            review_map[reviewer][proj].append(reviewee)
+
+@st.cache_resource(show_spinner=False)
+def live_survey(questions_path, roster_path, bundle_path):
+    # 每份問卷在整個 process 一份，檔案變更時由 watchdog 在背景重新解析並整份替換
+    return LiveSurvey(questions_path, roster_path, bundle_path).start()
+
+
+with metrics.phase("config_load", session_id):
+    live = live_survey(config.questions_path, config.roster_path, config.bundle_path)
+    # 選定身分前跟著最新版本；開始作答後固定在當時的版本，管理者中途修正名單不影響進行中的 session
+    if not state.user or state.survey_version is None:
+        state.survey_version = live.current.version
+    survey = live.get(state.survey_version)
+questions  = survey.questions
+review_map = survey.review_map
 
 # ---------------------------
 # 選擇填答者
 # ---------------------------
 if not state.user:
-    st.markdown('<h1 style="color:#FCFCFC; font-size:40px;">📋 2025Q1部門內部通評問卷</h1>', unsafe_allow_html=True)
+    st.markdown(f'<h1 style="color:#FCFCFC; font-size:40px;">📋 {config.title}</h1>', unsafe_allow_html=True)
     st.markdown('<p style="color:#FCFCFC; font-size:22px;">請根據專案和合作對象的協作情況填寫問卷。</p>', unsafe_allow_html=True)
     st.markdown('<p style="color:#FF5151; font-size:20px;">⚠️ 確實選擇身分，一人限填一次。</p>', unsafe_allow_html=True)
     name = st.selectbox("請選擇你的名字：", ["請選擇"] + list(review_map.keys()))
@@ -140,7 +170,10 @@ user = state.user
 # ---------------------------
 # 檢查是否已填過
 # ---------------------------
-if user in submitted_users["填答者"].values or state.submitted:
+with metrics.phase("submitted_check", session_id):
+    already_submitted = state.submitted or store.has_submitted(user)
+if already_submitted:
+    drafts.discard(drafts.draft_path(config.draft_dir, user))
     st.title("✅ 感謝填寫問卷！")
     st.success("您的回覆已成功提交，感謝！")
     st.stop()
@@ -148,9 +181,31 @@ if user in submitted_users["填答者"].values or state.submitted:
 # ---------------------------
 # 準備分頁資料
 # ---------------------------
-pages = [(proj, t) for proj, targets in review_map[user].items() for t in targets]
+with metrics.phase("page_build", session_id):
+    # pairs：每個 (專案, 對象) 一格，分數以 (pairs 索引, 題號) 存放
+    pairs = [(proj, t) for proj, targets in review_map[user].items() for t in targets]
+    items = [(cat, q) for cat, qlist in questions.items() for q in qlist]
+    if LAYOUT == "matrix":
+        pages = list(review_map[user].items())
+        page_starts = [0]
+        for _, targets in pages:
+            page_starts.append(page_starts[-1] + len(targets))
+    else:
+        pages = pairs
+if state.answers is None or (state.answers.n_pages, state.answers.n_questions) != (len(pairs), len(items)):
+    state.answers = AnswerStore(len(pairs), len(items))
+    # 同一位填答者重新進來（重新整理、斷線、伺服器重啟）時從草稿還原
+    state.draft = drafts.Draft(drafts.draft_path(config.draft_dir, user), survey.version, len(pairs), len(items))
+    restored, draft_page = state.draft.restore(state.answers)
+    if restored:
+        state.page = draft_page or 0
+        st.toast(f"已還原上次未完成的 {restored} 題")
+answers = state.answers
+draft = state.draft
 if state.page >= len(pages): state.page = 0
 curr_proj, curr_target = pages[state.page]
+if LAYOUT == "matrix":
+    curr_targets, curr_target = curr_target, "、".join(curr_target)
 
 # ---------------------------
 # 切換提示
@@ -173,7 +228,7 @@ window.location.href = '#top';
 # ---------
 # Sidebar 固定資訊
 # ---------
-st.sidebar.title("📋 2025Q1部門內部通評問卷")
+st.sidebar.title(f"📋 {config.title}")
 st.sidebar.markdown(
     f"""
     **專案：** {curr_proj}  
@@ -183,7 +238,7 @@ st.sidebar.markdown(
 )
 
 st.sidebar.image(
-    "data/DUN_吉卜力.png",           # 圖片路徑
+    thumbnail("data/DUN_吉卜力.png", 150),   # 縮圖後約數 KB，原圖 3 MB
     width=150 
 )
 st.sidebar.markdown(f"進度：{state.page+1} / {len(pages)}")
@@ -192,7 +247,7 @@ st.sidebar.markdown("<a href='#top'>🔝 回頂部</a>", unsafe_allow_html=True)
 # ---------
 # 主畫面標題
 # ---------
-st.title("📋 2025Q1部門內部通評問卷")
+st.title(f"📋 {config.title}")
 st.markdown(
     f"""
     <div style='padding:1.5rem; background:#f9f9f9; border-left:6px solid #1f77b4; margin-bottom:1.5rem; font-size:1.5rem; font-weight:bold; color:#000;'>
@@ -219,74 +274,170 @@ score_labels = {i: label for i, label in enumerate([
     "主導創新，影響決策"
 ], start=1)}
 
-missing = []
-answers_page = []
-total_q = sum(len(v) for v in questions.values())
-answered = 0
-cnt = 1
-for cat, qlist in questions.items():
+def go_to_page(page):
+    state.page = page
+    state.just_switched_page = True
+    draft.save(answers, page, force=True)
+    st.rerun()
+
+def submit_answers():
+    submitted_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    rows = [{**row, "填寫時間": submitted_at} for row in answers.rows(user, pairs, items)]
+    with metrics.phase("submission_write", session_id):
+        if WRITER == "sync":
+            with analytics.updating(aggregates_file, store) as record:
+                ok = store.submit(user, rows)
+                if ok:
+                    record(rows)
+        else:
+            ok = submission_writer(survey_code, STORAGE).submit(user, rows)
+    draft.discard()
+    if ok:
+        st.success("✅ 已完成提交，感謝！")
+    else:
+        st.warning("⚠️ 此身分已提交過問卷，本次回覆未重複寫入。")
+    state.submitted = True
+
+# ---------------------------
+# 矩陣模式：一個專案一頁，所有對象 × 子項目一次填寫、一次檢查
+# ---------------------------
+if LAYOUT == "matrix":
+    slots = range(page_starts[state.page], page_starts[state.page+1])
+    grid = pd.DataFrame(
+        [answers.page_scores(slot) for slot in slots],
+        index=pd.Index(curr_targets, name="被評者"),
+        columns=[f"q{qi}" for qi in range(len(items))],  # 子項目可能在不同大項目重名，欄名用題號、子項目只當標題
+        dtype="Int64",
+    )
+    with st.expander("評分說明 (1–10)"):
+        st.markdown("  \n".join(f"**{i}**：{label}" for i, label in score_labels.items()))
+    with st.form(f"matrix_{state.page}"), metrics.phase("render_questions", session_id):
+        edited = st.data_editor(
+            grid,
+            column_config={
+                f"q{qi}": st.column_config.NumberColumn(q["子項目"], help=f"{cat}｜{q['說明']}",
+                                                        min_value=1, max_value=10, step=1)
+                for qi, (cat, q) in enumerate(items)
+            },
+            num_rows="fixed",
+            use_container_width=True,
+        )
+        col_prev, col_next = st.columns([1, 1])
+        go_prev = state.page > 0 and col_prev.form_submit_button("⬅️ 上一個專案")
+        is_last = state.page == len(pages)-1
+        go_next = col_next.form_submit_button("✅ 完成填寫" if is_last else "➡️ 下一個專案")
+
+    missing = 0
+    for slot, row in zip(slots, edited.itertuples(index=False)):
+        for qi, score in enumerate(row):
+            score = None if pd.isna(score) else int(score)
+            missing += score is None
+            answers.set(slot, qi, score)
+    draft.save(answers, state.page)
+    total_cells = len(slots) * len(items)
+    st.progress((total_cells-missing)/total_cells, text=f"已完成 {total_cells-missing}/{total_cells} 格")
+    st.markdown(f"**{state.page+1}/{len(pages)}**")
+
+    if go_prev:
+        go_to_page(state.page - 1)
+    if go_next:
+        if missing:
+            st.error(f"還有 {missing} 格未填寫")
+        elif is_last and any(answers.missing(p) for p in range(len(pairs))):
+            st.error("前面還有專案未填完")
+        elif is_last:
+            submit_answers()
+        else:
+            go_to_page(state.page + 1)
+    st.stop()
+
+total_q = len(items)
+page_items = [{"key": str(qi), "qi": qi, "cat": cat, "no": qi+1, "title": q['子項目'], "desc": q['說明']}
+              for qi, (cat, q) in enumerate(items)]
+
+# 題目區塊與進度條：各題組是獨立的 fragment，點選只重跑該區塊並更新進度條
+blocks_area   = st.container()
+progress_slot = st.empty()
+
+def render_progress():
+    done = answers.answered(state.page)
+    progress_slot.progress(done/total_q, text=f"已完成 {done}/{total_q} 題")
+
+def set_score(qi, score):
+    answers.set(state.page, qi, score)
+    draft.save(answers, state.page)
+    state.progress_dirty = True
+
+@st.fragment
+def selector_block():
+    # 整頁一個元件：點選只在瀏覽器端更新，整頁填完或停頓後才同步一次
+    with metrics.phase("render_block", session_id):
+        render_selector()
+
+def render_selector():
+    picked = score_selector(page_items,
+                            scores={it["key"]: answers.get(state.page, it["qi"]) for it in page_items},
+                            labels=score_labels,
+                            key=f"score_selector_{state.page}")
+    changed = {int(k): v for k, v in (picked or {}).items() if v and answers.get(state.page, int(k)) != v}
+    if changed:
+        for qi, score in changed.items():
+            answers.set(state.page, qi, score)
+        draft.save(answers, state.page)
+        render_progress()
+
+@st.fragment
+def question_block(cat, items):
+    with metrics.phase("render_block", session_id):
+        render_questions(cat, items)
+
+def render_questions(cat, items):
     st.markdown(f"<hr style='border:none; border-top:1px solid #ccc; margin:1rem 0;'><h3 style='color:#FFFFFF;'>📘 {cat}</h3>", unsafe_allow_html=True)
-    for q in qlist:
-        key = f"{curr_proj}_{curr_target}_{q['子項目']}"
-        st.markdown(f"<div style='font-size:1.5rem; font-weight:bold; margin-top:2rem; color:#FCFCFC;'>Q{cnt}. {q['子項目']}</div>", unsafe_allow_html=True)
-        st.markdown(f"<div style='font-size:1.3rem; color:#E0E0E0; line-height:1.6'>{q['說明']}</div>", unsafe_allow_html=True)
+    for it in items:
+        qi = it["qi"]
+        st.markdown(f"<div style='font-size:1.5rem; font-weight:bold; margin-top:2rem; color:#FCFCFC;'>Q{it['no']}. {it['title']}</div>", unsafe_allow_html=True)
+        st.markdown(f"<div style='font-size:1.3rem; color:#E0E0E0; line-height:1.6'>{it['desc']}</div>", unsafe_allow_html=True)
         cols = st.columns(10)
         for i, col in enumerate(cols, start=1):
-            if col.button(str(i), key=f"btn_{key}_{i}", use_container_width=True,
-                          type="primary" if state.scores.get(key)==i else "secondary",
-                          help=score_labels[i]):
-                state.scores[key] = i
-                st.rerun()
-        if state.scores.get(key) is None:
-            missing.append(key)
-        else:
-            answered += 1
-        answers_page.append({
-            "填答者": user,
-            "專案": curr_proj,
-            "被評者": curr_target,
-            "大項目": cat,
-            "子項目": q['子項目'],
-            "分數": state.scores.get(key)
-        })
-        cnt += 1
+            col.button(str(i), key=f"btn_{state.page}_{qi}_{i}", use_container_width=True,
+                       type="primary" if answers.get(state.page, qi)==i else "secondary",
+                       help=score_labels[i], on_click=set_score, args=(qi, i))
+    if state.pop("progress_dirty", False):
+        render_progress()
+
+with blocks_area, metrics.phase("render_questions", session_id):
+    if SCORE_INPUT == "component":
+        selector_block()
+    else:
+        for cat in questions:
+            question_block(cat, [it for it in page_items if it["cat"] == cat])
+
+missing = answers.missing(state.page)
 
 # ---------------------------
 # 進度條 & 分頁控制
 # ---------------------------
-st.progress(answered/total_q, text=f"已完成 {answered}/{total_q} 題")
+render_progress()
 st.markdown(f"**{state.page+1}/{len(pages)}**")
 
 # 3 欄並排：上一位｜下一位/完成填寫｜回頂部
 col_prev, col_next, col_top = st.columns([1,1,1])
 with col_prev:
     if state.page > 0 and st.button("⬅️ 上一位"):
-        state.page -= 1
-        state.just_switched_page = True
-        st.rerun()
+        go_to_page(state.page - 1)
 with col_next:
     if state.page < len(pages)-1 and st.button("➡️ 下一位"):
         if missing:
             st.error("請填完所有題目再繼續")
         else:
-            state.answers.extend(answers_page)
-            state.page += 1
-            state.just_switched_page = True
-            st.rerun()
+            go_to_page(state.page + 1)
     elif state.page == len(pages)-1 and st.button("✅ 完成填寫"):
         if missing:
             st.error("還有題目未填寫")
+        elif any(answers.missing(p) for p in range(len(pairs))):
+            st.error("前面還有頁面未填完")
         else:
-            state.answers.extend(answers_page)
-            df = pd.DataFrame(state.answers)
-            df["填寫時間"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            if os.path.exists("data/results.csv"):
-                old_df = pd.read_csv("data/results.csv")
-                df_all = pd.concat([old_df, df], ignore_index=True)
-            else:
-                df_all = df
-            df_all.to_csv("data/results.csv", index=False)
-            submitted_users = pd.concat([submitted_users, pd.DataFrame([{"填答者": user}])], ignore_index=True)
-            submitted_users.to_csv(submitted_file, index=False)
-            st.success("✅ 已完成提交，感謝！")
-            state.submitted = True
\ No newline at end of file
+            submit_answers()
+# 片段內的點選每次都附加寫入草稿、依間隔 fsync，整頁重跑時立即 fsync
+if not state.submitted:
+    draft.save(answers, state.page, force=True)
@@ -0,0 +1,136 @@
+"""季末 HR 報表：每位被評者一份，含大項目平均、各專案明細與部門分布比較。
+
+結果儲存只讀一次、依被評者分割後交給 process pool 平行產生，每份報表由
+worker 直接寫檔，主 process 只收檔名與摘要，不會同時持有所有報表。
+
+    python hr_export.py --survey 2025Q1 --out exports/2025Q1
+    python hr_export.py --survey 2025Q1_RD6 --storage sqlite --format csv --workers 8
+"""
+import argparse
+import csv
+import hashlib
+import os
+import re
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import pandas as pd
+
+import surveys
+
+REPORT_COLUMNS = ["填答者", "專案", "大項目", "子項目", "分數"]
+
+
+def safe_filename(name):
+    return re.sub(r'[\\/:*?"<>|\s]+', "_", str(name)).strip("_") or "unnamed"
+
+
+def unique_filename(name, used):
+    """safe_filename 後與先前的報表撞名（不分大小寫）時加上姓名的短 hash，避免互相覆蓋。"""
+    base = safe_filename(name)
+    if base.casefold() in used:
+        base = f"{base}_{hashlib.sha1(str(name).encode('utf-8')).hexdigest()[:8]}"
+    used.add(base.casefold())
+    return base
+
+
+# ---------------------------
+# 部門分布：每位被評者的大項目平均，再取部門平均、標準差與百分位
+# ---------------------------
+def department_stats(df):
+    person_cat = df.groupby(["被評者", "大項目"], observed=True)["分數"].mean().unstack()
+    dept = pd.DataFrame({"部門平均": person_cat.mean(), "部門標準差": person_cat.std(ddof=0)})
+    return dept, person_cat.rank(pct=True)
+
+
+# ---------------------------
+# 單人報表（在 worker process 內執行）
+# ---------------------------
+def build_report(part, dept, percentile):
+    grouped = part.groupby("大項目", observed=True)
+    by_cat = grouped["分數"].agg(平均="mean", 筆數="size")
+    by_cat["評分人數"] = grouped["填答者"].nunique()
+    summary = by_cat.join(dept, how="left")
+    summary["差異"] = summary["平均"] - summary["部門平均"]
+    summary["Z 分數"] = summary["差異"] / summary["部門標準差"].where(summary["部門標準差"] > 0)
+    summary["部門百分位"] = percentile.reindex(summary.index)
+    summary = summary.reset_index().round(3)
+
+    by_project = part.pivot_table(index="專案", columns="大項目", values="分數", aggfunc="mean", observed=True)
+    by_project["整體"] = part.groupby("專案", observed=True)["分數"].mean()
+    by_project = by_project.reset_index().round(3)
+
+    by_item = (part.groupby(["大項目", "子項目"], observed=True)["分數"]
+               .agg(平均="mean", 最低="min", 最高="max", 筆數="size").reset_index().round(3))
+    return {"總覽": summary, "專案明細": by_project, "子項目": by_item}
+
+
+def write_report(name, filename, part, dept, percentile, out_dir, fmt):
+    sheets = build_report(part, dept, percentile)
+    base = os.path.join(out_dir, filename)
+    if fmt == "xlsx":
+        path, tmp = f"{base}.xlsx", f"{base}.tmp.xlsx"
+        with pd.ExcelWriter(tmp, engine="openpyxl") as writer:
+            for sheet, frame in sheets.items():
+                frame.to_excel(writer, sheet_name=sheet, index=False)
+        os.replace(tmp, path)
+    else:
+        path = base
+        for sheet, frame in sheets.items():
+            frame.to_csv(f"{base}_{sheet}.csv", index=False, encoding="utf-8-sig")
+    return name, os.path.basename(path), round(float(part["分數"].mean()), 3), part["填答者"].nunique()
+
+
+def _partitions(df):
+    # 依被評者分割；只保留報表需要的欄位，送進 worker 的資料量較小
+    for name, part in df.groupby("被評者", observed=True, sort=True):
+        yield name, part[REPORT_COLUMNS].reset_index(drop=True)
+
+
+def export(df, out_dir, fmt="xlsx", workers=None):
+    """產生全部報表與 index.csv，回傳報表數。同時送進 pool 的分割數有上限，其餘邊做邊送。"""
+    os.makedirs(out_dir, exist_ok=True)
+    df = df.assign(分數=pd.to_numeric(df["分數"], errors="coerce")).dropna(subset=["分數"])
+    dept, pct = department_stats(df)
+    workers = workers or os.cpu_count() or 1
+    count = 0
+    with ProcessPoolExecutor(workers) as ex, \
+            open(os.path.join(out_dir, "index.csv"), "w", newline="", encoding="utf-8-sig") as index_f:
+        index = csv.writer(index_f)
+        index.writerow(["被評者", "報表", "整體平均", "評分人數"])
+        pending, used = set(), set()
+        for name, part in _partitions(df):
+            filename = unique_filename(name, used)
+            pending.add(ex.submit(write_report, name, filename, part, dept, pct.loc[name], out_dir, fmt))
+            if len(pending) >= workers * 2:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    index.writerow(fut.result())
+                    count += 1
+        for fut in pending:
+            index.writerow(fut.result())
+            count += 1
+    return count
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--survey", default=surveys.DEFAULT_SURVEY, help="問卷代號（見 surveys.py）")
+    parser.add_argument("--storage", choices=["csv", "sqlite", "parquet"],
+                        default=os.environ.get("SURVEY_STORAGE", "csv"))
+    parser.add_argument("--out", help="輸出目錄，預設 exports/<問卷代號>")
+    parser.add_argument("--format", choices=["xlsx", "csv"], default="xlsx")
+    parser.add_argument("--workers", type=int, help="process 數，預設為 CPU 核心數")
+    args = parser.parse_args()
+
+    config = surveys.get(args.survey)
+    if config is None:
+        parser.error(f"找不到問卷：{args.survey}")
+    t0 = time.perf_counter()
+    store = config.open_store(args.storage)
+    replayed = config.replay_journals(store)
+    if replayed:
+        print(f"已從提交日誌補寫 {replayed} 筆結果")
+    results = store.query()
+    n = export(results, args.out or f"exports/{args.survey}", args.format, args.workers)
+    print(f"已產生 {n} 份報表（{len(results)} 筆結果），耗時 {time.perf_counter() - t0:.1f}s")
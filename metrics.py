@@ -0,0 +1,147 @@
+import json
+import logging
+import os
+import pickle
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+# ---------------------------
+# rerun 各階段計時與 Prometheus 文字格式匯出（整個 process 共用）
+# ---------------------------
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+_lock = threading.Lock()
+_phase_count = defaultdict(int)
+_phase_sum = defaultdict(float)
+_phase_buckets = defaultdict(lambda: [0] * len(BUCKETS))
+_reruns_total = 0
+_session_reruns = {}
+_session_state_bytes = {}
+_session_seen = {}
+_last_export = 0.0
+SESSION_TTL = 3600.0  # 超過這麼久沒有 rerun 的 session 視為已結束，從統計移除
+
+logger = logging.getLogger("survey.metrics")
+
+# SURVEY_METRICS_LOG=- 輸出至 stderr，其他值視為 JSON lines 檔案路徑；未設定則不輸出
+_log_target = os.environ.get("SURVEY_METRICS_LOG")
+if _log_target and not logger.handlers:
+    logger.addHandler(logging.StreamHandler() if _log_target == "-" else logging.FileHandler(_log_target, encoding="utf-8"))
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+# SURVEY_METRICS_FILE 例如 data/metrics_{pid}.prom；兩者都未設定時不量測 session 與 session_state
+EXPORT_FILE = os.environ.get("SURVEY_METRICS_FILE")
+ENABLED = bool(_log_target or EXPORT_FILE)
+
+
+def _log(event, **fields):
+    if logger.isEnabledFor(logging.INFO):
+        logger.info(json.dumps({"ts": round(time.time(), 3), "event": event, **fields}, ensure_ascii=False))
+
+
+@contextmanager
+def phase(name, session_id=None):
+    """量測一個 rerun 階段；st.stop() 等例外中斷時同樣會記錄。"""
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - t0
+        with _lock:
+            _phase_count[name] += 1
+            _phase_sum[name] += elapsed
+            buckets = _phase_buckets[name]
+            for i, bound in enumerate(BUCKETS):
+                if elapsed <= bound:
+                    buckets[i] += 1
+        _log("phase", phase=name, ms=round(elapsed * 1000, 2), session=session_id)
+
+
+def _state_size(state):
+    try:
+        return len(pickle.dumps({k: state[k] for k in state.keys()}, protocol=pickle.HIGHEST_PROTOCOL))
+    except Exception:
+        return None
+
+
+def _prune(now):
+    # 呼叫端持有 _lock
+    for sid in [sid for sid, seen in _session_seen.items() if now - seen > SESSION_TTL]:
+        _session_seen.pop(sid)
+        _session_reruns.pop(sid, None)
+        _session_state_bytes.pop(sid, None)
+
+
+def record_rerun(session_id, state):
+    """每次 rerun 開頭呼叫：累計該 session 的 rerun 次數並量測 session_state 大小。
+
+    未啟用記錄或匯出時直接返回，不做 pickle 量測。
+    """
+    global _reruns_total
+    if not ENABLED:
+        return
+    size = _state_size(state)
+    now = time.monotonic()
+    with _lock:
+        _reruns_total += 1
+        _session_reruns[session_id] = _session_reruns.get(session_id, 0) + 1
+        reruns = _session_reruns[session_id]
+        _session_seen[session_id] = now
+        if size is not None:
+            _session_state_bytes[session_id] = size
+        _prune(now)
+    _log("rerun", session=session_id, reruns=reruns, state_bytes=size)
+
+
+def render_prometheus():
+    # 每個 Streamlit process 各自匯出，以 pid 標籤區分
+    pid = f'pid="{os.getpid()}"'
+    with _lock:
+        lines = [
+            "# HELP survey_phase_seconds Time spent in each phase of a form_app rerun.",
+            "# TYPE survey_phase_seconds histogram",
+        ]
+        for name in sorted(_phase_count):
+            for bound, n in zip(BUCKETS, _phase_buckets[name]):
+                lines.append(f'survey_phase_seconds_bucket{{{pid},phase="{name}",le="{bound}"}} {n}')
+            lines.append(f'survey_phase_seconds_bucket{{{pid},phase="{name}",le="+Inf"}} {_phase_count[name]}')
+            lines.append(f'survey_phase_seconds_sum{{{pid},phase="{name}"}} {_phase_sum[name]:.6f}')
+            lines.append(f'survey_phase_seconds_count{{{pid},phase="{name}"}} {_phase_count[name]}')
+        sizes = list(_session_state_bytes.values())
+        lines += [
+            "# HELP survey_reruns_total Script reruns across all sessions.",
+            "# TYPE survey_reruns_total counter",
+            f"survey_reruns_total{{{pid}}} {_reruns_total}",
+            "# HELP survey_sessions Sessions with a rerun within the last SESSION_TTL seconds.",
+            "# TYPE survey_sessions gauge",
+            f"survey_sessions{{{pid}}} {len(_session_reruns)}",
+            "# HELP survey_session_reruns_max Highest rerun count of a single session.",
+            "# TYPE survey_session_reruns_max gauge",
+            f"survey_session_reruns_max{{{pid}}} {max(_session_reruns.values(), default=0)}",
+            "# HELP survey_session_state_bytes Pickled session_state size, summed and max over sessions.",
+            "# TYPE survey_session_state_bytes gauge",
+            f'survey_session_state_bytes{{{pid},agg="sum"}} {sum(sizes)}',
+            f'survey_session_state_bytes{{{pid},agg="max"}} {max(sizes, default=0)}',
+        ]
+    return "\n".join(lines) + "\n"
+
+
+def export_prometheus(path, min_interval=5.0):
+    """最多每 min_interval 秒寫一次 Prometheus 文字檔（可給 node_exporter textfile collector 讀）。
+
+    path 可含 {pid}，多個 Streamlit process 時各寫各的檔案。
+    """
+    global _last_export
+    path = path.format(pid=os.getpid())
+    now = time.monotonic()
+    with _lock:
+        if now - _last_export < min_interval:
+            return
+        _last_export = now
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(render_prometheus())
+    os.replace(tmp, path)
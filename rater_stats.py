@@ -0,0 +1,198 @@
+"""評分者校正與評分者間信度。
+
+寬鬆與嚴格的評分者混在同一份原始分數裡，這裡整張結果表一起做向量化計算：
+- 每位填答者內的標準化分數（z 分數）
+- 每個子項目的評分者間信度：ICC(1)（單向隨機效果，容許每位被評者評分人數不同）
+  與 Krippendorff's alpha（區間尺度）
+- 每位被評者平均分數的 bootstrap 信賴區間，依被評者分批交給 process pool
+
+    python rater_stats.py --survey 2025Q1 --out exports/2025Q1_stats
+"""
+import argparse
+import contextlib
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import surveys
+
+
+def _scores(df):
+    return pd.to_numeric(df["分數"], errors="coerce").to_numpy(dtype=float)
+
+
+# ---------------------------
+# 評分者校正：每位填答者的平均與標準差，分數換成 z 分數
+# ---------------------------
+def rater_zscores(df):
+    """回傳 (加上「標準化分數」欄的 df, 每位填答者的平均／標準差／筆數)。
+
+    只給過同一個分數的填答者標準差為 0，標準化分數記為 0。
+    """
+    x = _scores(df)
+    codes, raters = pd.factorize(df["填答者"])
+    n = np.bincount(codes, minlength=len(raters))
+    mean = np.bincount(codes, weights=x, minlength=len(raters)) / n
+    var = np.bincount(codes, weights=x * x, minlength=len(raters)) / n - mean ** 2
+    std = np.sqrt(np.clip(var, 0, None))
+    safe_std = np.where(std > 0, std, 1.0)
+    z = np.where(std[codes] > 0, (x - mean[codes]) / safe_std[codes], 0.0)
+    calibration = pd.DataFrame({"填答者": raters, "平均": mean, "標準差": std, "筆數": n})
+    return df.assign(標準化分數=z), calibration
+
+
+# ---------------------------
+# 評分者間信度：以 (大項目, 子項目, 被評者) 為一個單位，所有子項目一次計算
+# 不同大項目下可能有同名子項目，子項目一律以 (大項目, 子項目) 區分
+# ---------------------------
+def reliability(df):
+    x = _scores(df)
+    item_codes, items = pd.factorize(pd.MultiIndex.from_arrays([df["大項目"], df["子項目"]]))
+    unit_codes, units = pd.factorize(pd.MultiIndex.from_arrays([item_codes, df["被評者"]]))
+    unit_item = np.asarray([item for item, _ in units], dtype=np.int64)
+
+    m = np.bincount(unit_codes).astype(float)          # 每個單位的評分數
+    s1 = np.bincount(unit_codes, weights=x)            # Σx
+    s2 = np.bincount(unit_codes, weights=x * x)        # Σx²
+    n_items = len(items)
+
+    def per_item(values, mask=None):
+        w = values if mask is None else np.where(mask, values, 0.0)
+        return np.bincount(unit_item, weights=w, minlength=n_items)
+
+    # ICC(1)：MSB、MSW 與不等組大小的平均組大小 k0
+    n_units = per_item(np.ones_like(m))
+    n_obs = per_item(m)
+    grand = per_item(s1) / n_obs
+    ss_within = per_item(s2 - s1 ** 2 / m)
+    ss_between = per_item(s1 ** 2 / m) - n_obs * grand ** 2
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ms_between = ss_between / (n_units - 1)
+        ms_within = ss_within / (n_obs - n_units)
+        k0 = (n_obs - per_item(m * m) / n_obs) / (n_units - 1)
+        icc = (ms_between - ms_within) / (ms_between + (k0 - 1) * ms_within)
+
+    # Krippendorff's alpha（區間尺度）：只計入至少兩個評分的單位
+    pairable = m >= 2
+    n_pairable = per_item(m, pairable)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        # 單位內兩兩差平方和 Σ_{i≠j}(xi-xj)² = 2(mΣx² - (Σx)²)
+        d_unit = np.where(pairable, 2 * (m * s2 - s1 ** 2) / (m - 1), 0.0)
+        d_observed = per_item(d_unit) / n_pairable
+        p1, p2 = per_item(s1, pairable), per_item(s2, pairable)
+        d_expected = 2 * (n_pairable * p2 - p1 ** 2) / (n_pairable * (n_pairable - 1))
+        alpha = 1 - d_observed / d_expected
+
+    return pd.DataFrame({
+        "大項目": items.get_level_values(0),
+        "子項目": items.get_level_values(1),
+        "被評者數": n_units.astype(int),
+        "評分數": n_obs.astype(int),
+        "ICC1": icc,
+        "Krippendorff_alpha": alpha,
+    })
+
+
+# ---------------------------
+# Bootstrap 信賴區間：被評者內重抽評分，每批被評者一個 worker
+# ---------------------------
+def _bootstrap_batch(values, starts, sizes, n_boot, level, seed):
+    """values 依被評者排序；一次抽出 (n_boot, 該批總評分數) 的索引後以 reduceat 求各組平均。"""
+    rng = np.random.default_rng(seed)
+    group = np.repeat(np.arange(len(sizes)), sizes)
+    offsets = np.repeat(starts, sizes).astype(np.int32)
+    picks = (rng.random((n_boot, len(group)), dtype=np.float32) * sizes[group].astype(np.float32)).astype(np.int32)
+    picks = np.minimum(picks, (sizes[group] - 1).astype(np.int32)) + offsets  # float32 捨入可能剛好等於組大小
+    means = np.add.reduceat(values[picks], np.r_[0, np.cumsum(sizes)[:-1]], axis=1) / sizes
+    tail = (1 - level) / 2
+    return np.quantile(means, [tail, 1 - tail], axis=0)
+
+
+def _pool(workers):
+    # spawn：在 Streamlit 這類多 thread 的 process 裡 fork 並不安全；worker 在第一次送工作時才啟動
+    return ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn"))
+
+
+def bootstrap_ci(df, column="分數", n_boot=1000, level=0.95, workers=None, seed=0, max_cells=5_000_000,
+                 executor=None):
+    """每位被評者 column 平均的百分位 bootstrap 信賴區間。
+
+    每批的評分數 × n_boot 以 max_cells 為上限，每個 worker 的暫存陣列約在百 MB 內。
+    給了 executor 時共用呼叫端的 process pool，不另開。
+    """
+    values = pd.to_numeric(df[column], errors="coerce").to_numpy(dtype=float)
+    keep = ~np.isnan(values)
+    targets = df["被評者"].to_numpy()[keep]
+    values = values[keep]
+    order = np.argsort(targets, kind="stable")
+    values, targets = values[order], targets[order]
+    names, starts, sizes = np.unique(targets, return_index=True, return_counts=True)
+
+    limit = max(1, max_cells // n_boot)
+    batches, lo = [], 0
+    while lo < len(names):
+        hi, total = lo, 0
+        while hi < len(names) and (hi == lo or total + sizes[hi] <= limit):
+            total += sizes[hi]
+            hi += 1
+        batches.append((lo, hi))
+        lo = hi
+
+    seeds = np.random.SeedSequence(seed).spawn(len(batches))
+    jobs = [(values[starts[lo]:starts[hi - 1] + sizes[hi - 1]], starts[lo:hi] - starts[lo], sizes[lo:hi],
+             n_boot, level, s) for (lo, hi), s in zip(batches, seeds)]
+    workers = workers or os.cpu_count() or 1
+    if len(jobs) <= 1 or (executor is None and workers == 1):
+        parts = [_bootstrap_batch(*job) for job in jobs]
+    elif executor is not None:
+        parts = list(executor.map(_bootstrap_batch, *zip(*jobs)))
+    else:
+        with _pool(workers) as ex:
+            parts = list(ex.map(_bootstrap_batch, *zip(*jobs)))
+    bounds = np.concatenate(parts, axis=1) if parts else np.empty((2, 0))
+    means = np.add.reduceat(values, starts) / sizes if len(sizes) else np.empty(0)
+    return pd.DataFrame({"被評者": names, "平均": means, "下界": bounds[0], "上界": bounds[1], "評分數": sizes})
+
+
+def analyze(df, n_boot=1000, workers=None):
+    """全部統計；呼叫端以結果儲存的 version() 當 cache key。
+
+    原始分數與標準化分數的 bootstrap 共用一個 process pool；在 Streamlit 內呼叫時 workers 應給小一點。
+    """
+    scored, calibration = rater_zscores(df)
+    workers = workers or os.cpu_count() or 1
+    with _pool(workers) if workers > 1 else contextlib.nullcontext() as ex:
+        raw_ci = bootstrap_ci(scored, "分數", n_boot, workers=workers, executor=ex)
+        z_ci = bootstrap_ci(scored, "標準化分數", n_boot, workers=workers, executor=ex)
+    reviewees = raw_ci.merge(z_ci, on=["被評者", "評分數"], suffixes=("", "_標準化"))
+    return {"評分者": calibration, "信度": reliability(df), "被評者": reviewees}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--survey", default=surveys.DEFAULT_SURVEY, help="問卷代號（見 surveys.py）")
+    parser.add_argument("--storage", choices=["csv", "sqlite", "parquet"],
+                        default=os.environ.get("SURVEY_STORAGE", "csv"))
+    parser.add_argument("--out", help="輸出目錄，預設 exports/<問卷代號>_stats")
+    parser.add_argument("--boot", type=int, default=1000, help="bootstrap 次數")
+    parser.add_argument("--workers", type=int, help="process 數，預設為 CPU 核心數")
+    args = parser.parse_args()
+
+    config = surveys.get(args.survey)
+    if config is None:
+        parser.error(f"找不到問卷：{args.survey}")
+    t0 = time.perf_counter()
+    store = config.open_store(args.storage)
+    replayed = config.replay_journals(store)
+    if replayed:
+        print(f"已從提交日誌補寫 {replayed} 筆結果")
+    results = store.query()
+    out = args.out or f"exports/{args.survey}_stats"
+    os.makedirs(out, exist_ok=True)
+    for name, frame in analyze(results, args.boot, args.workers).items():
+        frame.round(4).to_csv(os.path.join(out, f"{name}.csv"), index=False, encoding="utf-8-sig")
+    print(f"已計算 {len(results)} 筆結果的統計：{out}（{time.perf_counter() - t0:.1f}s）")
@@ -0,0 +1,17 @@
+import os
+
+import streamlit.components.v1 as components
+
+_component = components.declare_component(
+    "score_selector",
+    path=os.path.join(os.path.dirname(os.path.abspath(__file__)), "components", "score_selector"),
+)
+
+
+def score_selector(items, scores, labels, key):
+    """整頁題目的 1–10 分選擇器。
+
+    選擇先保留在瀏覽器端，整頁填完或停止點選一段時間後才一次同步回伺服器，
+    回傳 {題目 key: 分數}（尚未同步前為 None）。
+    """
+    return _component(items=items, scores=scores, labels=labels, key=key, default=None)
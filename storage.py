@@ -0,0 +1,425 @@
+import argparse
+import csv
+import os
+import sqlite3
+import time
+import uuid
+from contextlib import closing, contextmanager
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+RESULT_COLUMNS = ["填答者", "專案", "被評者", "大項目", "子項目", "分數", "填寫時間"]
+SUBMITTED_COLUMNS = ["填答者"]
+
+
+# ---------------------------
+# 跨 process 檔案鎖
+# ---------------------------
+@contextmanager
+def file_lock(path, shared=False):
+    """以 <path>.lock 作為互斥鎖，多個 Streamlit process 同時提交時依序寫入。
+
+    shared=True 為共享鎖，只擋住持有互斥鎖的一方（Windows 沒有共享鎖，退化為互斥）。
+    """
+    with open(f"{path}.lock", "a+b") as lock_f:
+        if fcntl:
+            fcntl.flock(lock_f, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        else:
+            lock_f.seek(0)
+            msvcrt.locking(lock_f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(lock_f, fcntl.LOCK_UN)
+            else:
+                lock_f.seek(0)
+                msvcrt.locking(lock_f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def append_rows(path, rows, columns):
+    """只把新的列附加到 CSV 尾端（必要時先寫表頭），寫完 fsync 後才釋放鎖。"""
+    with file_lock(path):
+        new_file = not os.path.exists(path) or os.path.getsize(path) == 0
+        with open(path, "a", newline="", encoding="utf-8") as f:
+            # pandas 寫出的既有檔案以 \n 換行，附加時保持一致
+            writer = csv.DictWriter(f, fieldnames=columns, extrasaction="ignore", lineterminator="\n")
+            if new_file:
+                writer.writeheader()
+            writer.writerows(rows)
+            f.flush()
+            os.fsync(f.fileno())
+
+
+CSV_CHUNKSIZE = 50_000
+
+
+def _filter(df, reviewee=None, project=None):
+    if reviewee is not None:
+        df = df[df["被評者"] == reviewee]
+    if project is not None:
+        df = df[df["專案"] == project]
+    return df
+
+
+# ---------------------------
+# CSV 模式：results.csv + submitted_users.csv
+# ---------------------------
+class CsvStore:
+    def __init__(self, results_path, submitted_path):
+        self.results_path = results_path
+        self.submitted_path = submitted_path
+
+    def append(self, rows):
+        append_rows(self.results_path, rows, RESULT_COLUMNS)
+
+    def has_submitted(self, user):
+        if not os.path.exists(self.submitted_path):
+            return False
+        return user in pd.read_csv(self.submitted_path)["填答者"].values
+
+    def mark_submitted(self, user):
+        append_rows(self.submitted_path, [{"填答者": user}], SUBMITTED_COLUMNS)
+
+    def submitted_since(self, cursor):
+        """從上次讀到的位元組位置往後讀新增的填答者，回傳 (名單, 新位置)。"""
+        if not os.path.exists(self.submitted_path):
+            return [], None
+        with open(self.submitted_path, "rb") as f:
+            if cursor is None or cursor > os.fstat(f.fileno()).st_size:
+                f.readline()  # 表頭
+            else:
+                f.seek(cursor)
+            start = f.tell()
+            data = f.read()
+        end = data.rfind(b"\n") + 1  # 只處理完整寫入的列
+        users = [row[0] for row in csv.reader(data[:end].decode("utf-8").splitlines()) if row]
+        return users, start + end
+
+    def claim(self, user, before_mark=None):
+        """一人一次：在名單鎖內檢查並登記，已提交過回傳 False。
+
+        before_mark 在確認未提交後、登記前呼叫（例如寫結果或日誌）。
+        """
+        with file_lock(f"{self.submitted_path}.claim"):
+            if self.has_submitted(user):
+                return False
+            if before_mark:
+                before_mark()
+            self.mark_submitted(user)
+        return True
+
+    def submit(self, user, rows):
+        """一人一次：已提交過則不寫入並回傳 False。"""
+        return self.claim(user, lambda: self.append(rows))
+
+    def version(self):
+        """結果只會附加，檔案大小與 mtime 不變就代表內容沒變，可作為 cache key。"""
+        if not os.path.exists(self.results_path):
+            return (0, 0)
+        st_ = os.stat(self.results_path)
+        return (st_.st_mtime_ns, st_.st_size)
+
+    def _matching_chunks(self, reviewee, project):
+        # 分塊讀檔、邊讀邊篩，不會把整個 results.csv 留在記憶體
+        if not os.path.exists(self.results_path):
+            return
+        for chunk in pd.read_csv(self.results_path, chunksize=CSV_CHUNKSIZE):
+            chunk = _filter(chunk, reviewee, project)
+            if not chunk.empty:
+                yield chunk
+
+    def query(self, reviewee=None, project=None):
+        chunks = list(self._matching_chunks(reviewee, project))
+        if not chunks:
+            return pd.DataFrame(columns=RESULT_COLUMNS)
+        return pd.concat(chunks, ignore_index=True)
+
+    def page(self, reviewee=None, project=None, offset=0, limit=50):
+        """回傳 (第 offset 筆起最多 limit 筆, 符合條件的總筆數)。"""
+        kept, total = [], 0
+        for chunk in self._matching_chunks(reviewee, project):
+            lo, hi = max(offset - total, 0), max(offset + limit - total, 0)
+            if lo < len(chunk) and hi > 0:
+                kept.append(chunk.iloc[lo:hi])
+            total += len(chunk)
+        df = pd.concat(kept, ignore_index=True) if kept else pd.DataFrame(columns=RESULT_COLUMNS)
+        return df, total
+
+
+# ---------------------------
+# SQLite 模式（WAL）
+# ---------------------------
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    填答者 TEXT NOT NULL,
+    專案   TEXT NOT NULL,
+    被評者 TEXT NOT NULL,
+    大項目 TEXT NOT NULL,
+    子項目 TEXT NOT NULL,
+    分數   INTEGER NOT NULL,
+    填寫時間 TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_results_rater   ON results (填答者);
+CREATE INDEX IF NOT EXISTS idx_results_target  ON results (被評者, 專案);
+CREATE INDEX IF NOT EXISTS idx_results_item    ON results (大項目, 子項目);
+CREATE TABLE IF NOT EXISTS submitted_users (
+    填答者 TEXT PRIMARY KEY
+);
+"""
+
+
+class SqliteStore:
+    def __init__(self, db_path):
+        self.db_path = db_path
+        with closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+
+    def _connect(self):
+        # 每次呼叫各自開連線，Streamlit 每個 session 跑在不同 thread
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _insert_results(self, conn, rows):
+        conn.executemany(
+            f"INSERT INTO results ({', '.join(RESULT_COLUMNS)}) VALUES ({', '.join('?' * len(RESULT_COLUMNS))})",
+            [tuple(row.get(c) for c in RESULT_COLUMNS) for row in rows],
+        )
+
+    def append(self, rows):
+        with closing(self._connect()) as conn, conn:
+            self._insert_results(conn, rows)
+
+    def has_submitted(self, user):
+        with closing(self._connect()) as conn:
+            return conn.execute("SELECT 1 FROM submitted_users WHERE 填答者 = ?", (user,)).fetchone() is not None
+
+    def mark_submitted(self, user):
+        with closing(self._connect()) as conn, conn:
+            conn.execute("INSERT OR IGNORE INTO submitted_users (填答者) VALUES (?)", (user,))
+
+    def submitted_since(self, cursor):
+        """回傳 rowid 大於 cursor 的填答者與新的 cursor。"""
+        with closing(self._connect()) as conn:
+            rows = conn.execute("SELECT rowid, 填答者 FROM submitted_users WHERE rowid > ? ORDER BY rowid",
+                                (cursor or 0,)).fetchall()
+        return [user for _, user in rows], (rows[-1][0] if rows else cursor)
+
+    def claim(self, user, before_mark=None):
+        """一人一次：PRIMARY KEY 衝突即代表已提交；before_mark 在 commit 前呼叫。"""
+        with closing(self._connect()) as conn:
+            try:
+                with conn:
+                    conn.execute("INSERT INTO submitted_users (填答者) VALUES (?)", (user,))
+                    if before_mark:
+                        before_mark()
+            except sqlite3.IntegrityError:
+                return False
+        return True
+
+    def submit(self, user, rows):
+        """一人一次：登記與結果寫入在同一個 transaction，PRIMARY KEY 衝突即代表已提交。"""
+        with closing(self._connect()) as conn:
+            try:
+                with conn:
+                    conn.execute("INSERT INTO submitted_users (填答者) VALUES (?)", (user,))
+                    self._insert_results(conn, rows)
+            except sqlite3.IntegrityError:
+                return False
+        return True
+
+    def version(self):
+        """結果只會附加，最大 rowid 即可代表目前的資料版本。"""
+        with closing(self._connect()) as conn:
+            return conn.execute("SELECT COALESCE(MAX(rowid), 0) FROM results").fetchone()[0]
+
+    @staticmethod
+    def _where(reviewee, project):
+        sql, params = " WHERE 1=1", []
+        if reviewee is not None:
+            sql += " AND 被評者 = ?"
+            params.append(reviewee)
+        if project is not None:
+            sql += " AND 專案 = ?"
+            params.append(project)
+        return sql, params
+
+    def query(self, reviewee=None, project=None):
+        where, params = self._where(reviewee, project)
+        with closing(self._connect()) as conn:
+            return pd.read_sql_query(f"SELECT {', '.join(RESULT_COLUMNS)} FROM results{where}", conn, params=params)
+
+    def page(self, reviewee=None, project=None, offset=0, limit=50):
+        """回傳 (第 offset 筆起最多 limit 筆, 符合條件的總筆數)。"""
+        where, params = self._where(reviewee, project)
+        with closing(self._connect()) as conn:
+            total = conn.execute(f"SELECT COUNT(*) FROM results{where}", params).fetchone()[0]
+            df = pd.read_sql_query(
+                f"SELECT {', '.join(RESULT_COLUMNS)} FROM results{where} ORDER BY rowid LIMIT ? OFFSET ?",
+                conn, params=[*params, limit, offset])
+        return df, total
+
+
+# ---------------------------
+# Parquet 模式：文字欄位字典編碼、分數 int8，依問卷分區
+# ---------------------------
+PARQUET_SCHEMA = pa.schema(
+    [(c, pa.dictionary(pa.int32(), pa.string())) for c in RESULT_COLUMNS[:5]]
+    + [("分數", pa.int8()), ("填寫時間", pa.string())]
+)
+
+
+# 問卷代號一律當字串；讓 pyarrow 自行推斷時，全數字的代號（例如 2025）會變成 int32
+SURVEY_PARTITIONING = ds.partitioning(pa.schema([("survey", pa.string())]), flavor="hive")
+
+
+def write_parquet_part(df, root, survey):
+    """寫成 <root>/survey=<survey>/part-*.parquet；先寫暫存檔再改名，讀取端不會讀到半個檔案。"""
+    part_dir = os.path.join(root, f"survey={survey}")
+    os.makedirs(part_dir, exist_ok=True)
+    table = pa.Table.from_pandas(df[RESULT_COLUMNS], schema=PARQUET_SCHEMA, preserve_index=False)
+    name = f"part-{time.time_ns()}-{uuid.uuid4().hex[:8]}.parquet"
+    path = os.path.join(part_dir, name)
+    # 暫存檔以 . 開頭，pyarrow 探索資料集時會略過；否則當掉留下的暫存檔會被當成資料重複計算
+    tmp = os.path.join(part_dir, f".{name}.tmp")
+    pq.write_table(table, tmp, compression="zstd")
+    os.replace(tmp, path)
+    return path
+
+
+def read_parquet(root, survey=None, columns=None, reviewee=None, project=None):
+    """只讀需要的分區與欄位；字典編碼欄位讀回來是 pandas category。
+
+    讀取時持有 root 的共享鎖，compact() 換檔期間不會同時讀到新舊檔而重複計算。
+    """
+    if not os.path.isdir(root):
+        return pd.DataFrame(columns=columns or RESULT_COLUMNS)
+    cond = None
+    for field, value in (("survey", survey), ("被評者", reviewee), ("專案", project)):
+        if value is not None:
+            expr = ds.field(field) == value
+            cond = expr if cond is None else cond & expr
+    with file_lock(root, shared=True):
+        dataset = ds.dataset(root, format="parquet", partitioning=SURVEY_PARTITIONING, exclude_invalid_files=True)
+        return dataset.to_table(columns=columns or RESULT_COLUMNS, filter=cond).to_pandas()
+
+
+class ParquetStore(CsvStore):
+    """結果存成 Parquet 分區；提交名單與一人一次的登記沿用 CsvStore。"""
+
+    def __init__(self, root, survey, submitted_path):
+        super().__init__(results_path=None, submitted_path=submitted_path)
+        self.root = root
+        self.survey = survey
+
+    def append(self, rows):
+        write_parquet_part(pd.DataFrame(rows, columns=RESULT_COLUMNS), self.root, self.survey)
+
+    def version(self):
+        part_dir = os.path.join(self.root, f"survey={self.survey}")
+        if not os.path.isdir(part_dir):
+            return (0, 0)
+        parts = [e.name for e in os.scandir(part_dir) if e.name.endswith(".parquet")]
+        return (len(parts), max(parts, default=""))
+
+    def query(self, reviewee=None, project=None):
+        return read_parquet(self.root, self.survey, reviewee=reviewee, project=project)
+
+    def page(self, reviewee=None, project=None, offset=0, limit=50):
+        df = self.query(reviewee, project)
+        return df.iloc[offset:offset + limit].reset_index(drop=True), len(df)
+
+    def compact(self):
+        """把多次提交產生的小檔合併成一個。
+
+        寫入合併檔到刪除舊檔之間持有 root 的互斥鎖，讀取端（共享鎖）要等換檔完成。
+        新提交的寫入不受影響：合併只處理開始時列出的檔案。
+        """
+        part_dir = os.path.join(self.root, f"survey={self.survey}")
+        with file_lock(part_dir):
+            parts = [os.path.join(part_dir, n) for n in os.listdir(part_dir) if n.endswith(".parquet")]
+            if len(parts) <= 1:
+                return len(parts)
+            df = pq.ParquetDataset(parts).read().to_pandas()
+            with file_lock(self.root):
+                write_parquet_part(df, self.root, self.survey)
+                for path in parts:
+                    os.remove(path)
+        return len(parts)
+
+
+def open_store(backend, results_path, submitted_path, db_path, parquet_root=None, survey=None):
+    if backend == "sqlite":
+        return SqliteStore(db_path)
+    if backend == "parquet":
+        return ParquetStore(parquet_root, survey, submitted_path)
+    return CsvStore(results_path, submitted_path)
+
+
+# ---------------------------
+# 匯入既有 CSV 至 SQLite
+# ---------------------------
+def migrate_csv(results_path, db_path, submitted_path=None):
+    """整批在一個 transaction 內匯入；results 已有資料時拒絕，重跑不會重複匯入。"""
+    store = SqliteStore(db_path)
+    df = pd.read_csv(results_path)
+    users = pd.read_csv(submitted_path)["填答者"] if submitted_path and os.path.exists(submitted_path) else df["填答者"].unique()
+    with closing(store._connect()) as conn, conn:
+        conn.execute("BEGIN IMMEDIATE")  # 先取得寫入鎖，同時執行的匯入不會都通過下面的檢查
+        if conn.execute("SELECT 1 FROM results LIMIT 1").fetchone():
+            raise ValueError(f"{db_path} 的 results 已有資料，未匯入；請改用新的資料庫檔")
+        store._insert_results(conn, df.to_dict("records"))
+        conn.executemany("INSERT OR IGNORE INTO submitted_users (填答者) VALUES (?)", [(u,) for u in users])
+    return len(df)
+
+
+# ---------------------------
+# 既有 CSV 轉 Parquet
+# ---------------------------
+def csv_to_parquet(results_path, root, survey, chunksize=200_000):
+    n = 0
+    for chunk in pd.read_csv(results_path, chunksize=chunksize):
+        write_parquet_part(chunk, root, survey)
+        n += len(chunk)
+    return n
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="問卷結果儲存工具")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p_migrate = sub.add_parser("migrate", help="將 results.csv 匯入 SQLite")
+    p_migrate.add_argument("results_csv")
+    p_migrate.add_argument("db")
+    p_migrate.add_argument("--submitted", help="submitted_users.csv（省略時以結果中的填答者為準）")
+    p_parquet = sub.add_parser("to-parquet", help="將 results.csv 轉成字典編碼的 Parquet 分區")
+    p_parquet.add_argument("results_csv")
+    p_parquet.add_argument("root", help="Parquet 根目錄，例如 data/results_parquet")
+    p_parquet.add_argument("--survey", required=True, help="分區名稱，例如 2025Q1_RD6")
+    p_compact = sub.add_parser("compact", help="合併某個問卷分區的小檔")
+    p_compact.add_argument("root")
+    p_compact.add_argument("--survey", required=True)
+    args = parser.parse_args()
+
+    if args.cmd == "to-parquet":
+        n = csv_to_parquet(args.results_csv, args.root, args.survey)
+        print(f"已轉換 {n} 筆結果至 {args.root}/survey={args.survey}")
+    elif args.cmd == "compact":
+        n = ParquetStore(args.root, args.survey, submitted_path=None).compact()
+        print(f"已合併 {n} 個檔案")
+    elif args.cmd == "migrate":
+        try:
+            n = migrate_csv(args.results_csv, args.db, args.submitted)
+        except ValueError as e:
+            parser.error(str(e))
+        print(f"已匯入 {n} 筆結果至 {args.db}")
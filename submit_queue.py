@@ -0,0 +1,249 @@
+import argparse
+import atexit
+import glob
+import json
+import logging
+import os
+import queue
+import threading
+import time
+import uuid
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+logger = logging.getLogger("survey.submit_queue")
+
+_writers = []
+
+
+def _try_lock(f):
+    """非阻塞獨占鎖；持有者的 process 結束時由作業系統釋放。"""
+    try:
+        if fcntl:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+    except OSError:
+        return False
+    return True
+
+
+def _read_journal(f):
+    # 從已開啟並上鎖的檔案讀，不再以路徑重開（主人可能正好刪掉）
+    entries = []
+    for line in f:
+        try:
+            entries.append(json.loads(line))
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            break  # 最後一列寫到一半：該筆尚未確認，填答者沒有收到成功訊息
+    return entries
+
+
+def _unlink(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass  # 已被另一個 process 補寫後刪除
+
+
+def orphaned(journal_dir):
+    """已無主人（寫入它的 process 已結束）且仍有內容的日誌。"""
+    paths = []
+    for path in glob.glob(os.path.join(journal_dir, "*.jsonl")):
+        try:
+            with open(path, "rb") as f:
+                if os.fstat(f.fileno()).st_size and _try_lock(f):
+                    paths.append(path)
+        except FileNotFoundError:
+            pass  # 主人剛寫完刪掉
+    return paths
+
+
+def recover(store, journal_dir, commit=None):
+    """補寫已無主人的日誌，回傳補寫筆數；已寫入結果的填答者略過。
+
+    commit(rows) 負責寫入（預設 store.append），例如連同彙總一起更新；失敗時會重試。
+
+    form_app 建立寫入器時會呼叫；匯出、統計等需要完整結果的工具讀取前也應先呼叫。
+    """
+    total = 0
+    for path in glob.glob(os.path.join(journal_dir, "*.jsonl")):
+        try:
+            f = open(path, "rb")
+        except FileNotFoundError:
+            continue
+        with f:
+            if not _try_lock(f):
+                continue
+            entries = _read_journal(f)
+            if entries:
+                written = set(store.query()["填答者"])
+                rows = []
+                for entry in entries:
+                    if entry["user"] in written:
+                        continue
+                    if store.has_submitted(entry["user"]):
+                        rows += entry["rows"]
+                    elif store.claim(entry["user"]):
+                        # 當掉時尚未登記：這位填答者沒收到成功訊息，但回覆完整，照常寫入
+                        rows += entry["rows"]
+                if rows:
+                    _write(commit or store.append, rows)
+                    logger.info("從 %s 補寫 %d 筆", path, len(rows))
+                total += len(rows)
+        _unlink(path)
+    return total
+
+
+def _write(commit, rows):
+    delay = 0.1
+    while True:
+        try:
+            commit(rows)
+            return
+        except Exception:
+            # 結果儲存暫時無法寫入（磁碟滿、資料庫鎖逾時）：日誌還在，稍後重試
+            logger.exception("批次寫入 %d 筆失敗，%.1f 秒後重試", len(rows), delay)
+            time.sleep(delay)
+            delay = min(delay * 2, 5.0)
+
+
+# ---------------------------
+# 提交佇列：登記與日誌同步完成即回覆，結果由背景 thread 批次寫入
+# ---------------------------
+class GroupCommitWriter:
+    """每個 process、每份問卷一個；多個 session 的提交合併成一次 store.append。
+
+    一人一次的登記仍在 claim 內同步完成，結果列先 fsync 到本 process 的日誌
+    （<journal_dir>/<pid>-<id>.jsonl）才登記，因此回覆成功後即使 process 當掉，
+    下一個啟動的 process 也會從日誌補寫。每批開始寫入前換一個新日誌檔，舊檔裡的
+    提交全部寫入結果儲存後即刪除，持續有人提交時日誌也不會一直變大。
+    """
+
+    def __init__(self, store, journal_dir, commit=None, max_rows=5000, max_delay=0.2):
+        self.store = store
+        self.journal_dir = journal_dir
+        self.commit = commit or store.append  # 寫入一批結果；拋出例外時重試，因此應是全有或全無
+        self.max_rows = max_rows
+        self.max_delay = max_delay
+        self._queue = queue.Queue()
+        self._journal_lock = threading.Lock()
+        self._journals = {}  # 世代 -> [日誌檔, 尚未寫入結果儲存的提交數]
+        self._gen = 0
+
+        os.makedirs(journal_dir, exist_ok=True)
+        recover(store, journal_dir, self.commit)
+        self._rotate()
+
+        self._thread = threading.Thread(target=self._run, name="survey-group-commit", daemon=True)
+        self._thread.start()
+        _writers.append(self)
+
+    def _rotate(self):
+        # 呼叫端持有 _journal_lock（建構時除外）；開檔失敗時不換，沿用目前的日誌
+        f = open(os.path.join(self.journal_dir, f"{os.getpid()}-{uuid.uuid4().hex[:8]}.jsonl"), "a+b")
+        _try_lock(f)  # 持有到刪除或 process 結束，其他 process 才知道這份日誌還有主人
+        self._gen += 1
+        self._journals[self._gen] = [f, 0]
+
+    def submit(self, user, rows):
+        """已提交過回傳 False；回傳 True 時結果已寫入日誌，稍後由背景 thread 寫入結果儲存。"""
+        line = (json.dumps({"user": user, "rows": rows}, ensure_ascii=False) + "\n").encode("utf-8")
+        gen = None
+
+        def journal():
+            nonlocal gen
+            with self._journal_lock:
+                gen = self._gen
+                entry = self._journals[gen]
+                entry[0].write(line)
+                entry[0].flush()
+                os.fsync(entry[0].fileno())
+                entry[1] += 1
+
+        if not self.store.claim(user, journal):
+            return False
+        self._queue.put((gen, rows))
+        return True
+
+    def flush(self, timeout=None):
+        """等待佇列中的提交全部寫入，回傳是否已清空（測試與關閉前使用）。"""
+        with self._queue.all_tasks_done:
+            return self._queue.all_tasks_done.wait_for(lambda: not self._queue.unfinished_tasks, timeout)
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            try:
+                self._commit(batch)
+            except Exception:
+                # 不讓背景 thread 結束：結果仍在日誌，最壞情況是下次啟動時補寫
+                logger.exception("處理 %d 筆提交時發生錯誤", len(batch))
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        n_rows = len(batch[0][1])
+        deadline = time.monotonic() + self.max_delay
+        while n_rows < self.max_rows:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+            n_rows += len(batch[-1][1])
+        return batch
+
+    def _commit(self, batch):
+        try:
+            with self._journal_lock:
+                if self._journals[self._gen][1]:
+                    self._rotate()  # 寫入期間的新提交記在新檔
+        except OSError:
+            logger.exception("無法建立新日誌，沿用目前的日誌")
+        _write(self.commit, [row for _, rows in batch for row in rows])
+        with self._journal_lock:
+            for gen, _ in batch:
+                self._journals[gen][1] -= 1
+            for gen in [g for g, (_, n) in self._journals.items() if n == 0 and g != self._gen]:
+                # 舊日誌的提交都已寫入；關檔後到刪除前若被別的 process 補寫，也會因已寫入而略過
+                f = self._journals.pop(gen)[0]
+                f.close()
+                try:
+                    _unlink(f.name)
+                except OSError:
+                    logger.exception("無法刪除日誌 %s，下次啟動時會略過其中已寫入的提交", f.name)
+
+
+def flush_all(timeout=None):
+    for writer in list(_writers):
+        writer.flush(timeout)
+
+
+# 正常結束（Ctrl+C、SIGTERM 後的關閉流程）時把佇列寫完；沒寫完的仍在日誌，下次啟動補寫
+atexit.register(flush_all, 10.0)
+
+
+if __name__ == "__main__":
+    import surveys
+
+    parser = argparse.ArgumentParser(description="補寫已無主人的提交日誌（process 當掉或被強制結束時留下）")
+    parser.add_argument("--survey", default=surveys.DEFAULT_SURVEY, help="問卷代號（見 surveys.py）")
+    parser.add_argument("--storage", choices=["csv", "sqlite", "parquet"],
+                        default=os.environ.get("SURVEY_STORAGE", "csv"))
+    args = parser.parse_args()
+
+    config = surveys.get(args.survey)
+    if config is None:
+        parser.error(f"找不到問卷：{args.survey}")
+    n = config.replay_journals(config.open_store(args.storage))
+    print(f"已從 {config.journal_dir} 補寫 {n} 筆結果")
@@ -0,0 +1,182 @@
+import hashlib
+import json
+import os
+from dataclasses import dataclass
+from functools import lru_cache
+from types import MappingProxyType
+
+import numpy as np
+import pandas as pd
+
+# ---------------------------
+# 編譯後的問卷定義（整個 process 共用、唯讀）
+# ---------------------------
+@dataclass(frozen=True)
+class Survey:
+    questions: MappingProxyType   # 大項目 -> ({"子項目", "說明"}, ...)
+    review_map: MappingProxyType  # 評分者 -> 專案 -> (對象, ...)
+    version: str                  # 兩個來源檔內容的 hash
+
+
+def _file_signature(path):
+    st_ = os.stat(path)
+    return st_.st_mtime_ns, st_.st_size
+
+
+def content_hash(*blobs):
+    h = hashlib.sha1()
+    for blob in blobs:
+        h.update(blob)
+    return h.hexdigest()[:12]
+
+
+def _read_bytes(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+# ---------------------------
+# 解析題目
+# ---------------------------
+def parse_questions(questions_df):
+    questions = {}
+    current_cat = None
+    for _, row in questions_df.iterrows():
+        if pd.notna(row["大項目"]):
+            current_cat = row["大項目"]
+        if pd.notna(row["子項目"]):
+            questions.setdefault(current_cat, []).append(MappingProxyType({
+                "子項目": row["子項目"],
+                "說明": str(row["說明"]).strip()
+            }))
+    return MappingProxyType({cat: tuple(qlist) for cat, qlist in questions.items()})
+
+
+# ---------------------------
+# 建立 reviewer->project->reviewees 映射
+# ---------------------------
+def build_review_map(people_df, reviewer_col="被評者", reviewee_col="填答者"):
+    """以整張表的布林遮罩找出有標記的格子，只對命中的 (人, 專案) 建索引。"""
+    project_cols = people_df.columns[2:]
+    marks = people_df[project_cols]
+    mask = marks.notna().to_numpy()
+    for i, col in enumerate(project_cols):
+        if not pd.api.types.is_numeric_dtype(marks[col]):
+            # 文字欄位中只有空白的格子不算標記
+            mask[:, i] &= marks[col].astype(str).str.strip().ne("").to_numpy()
+
+    # np.nonzero 依列優先排序，保留原本逐列、逐專案的出現順序
+    rows, cols = np.nonzero(mask)
+    reviewers = people_df[reviewer_col].to_numpy()[rows]
+    reviewees = people_df[reviewee_col].to_numpy()[rows]
+    projects = np.asarray(project_cols, dtype=object)[cols]
+
+    review_map = {}
+    for reviewer, proj, reviewee in zip(reviewers, projects, reviewees):
+        review_map.setdefault(reviewer, {}).setdefault(proj, []).append(reviewee)
+    return MappingProxyType({
+        reviewer: MappingProxyType({proj: tuple(targets) for proj, targets in projs.items()})
+        for reviewer, projs in review_map.items()
+    })
+
+
+# ---------------------------
+# 上傳前檢查
+# ---------------------------
+def validate(questions_df, people_df):
+    """回傳 (errors, warnings)；有 errors 時不應編譯。"""
+    errors, warnings = [], []
+    for col in ("大項目", "子項目", "說明"):
+        if col not in questions_df.columns:
+            errors.append(f"評分項目缺少「{col}」欄")
+    for col in ("填答者", "被評者"):
+        if col not in people_df.columns:
+            errors.append(f"互評名單缺少「{col}」欄")
+    if errors:
+        return errors, warnings
+
+    sub_items = questions_df["子項目"].dropna().astype(str).str.strip()
+    for name in sorted(set(sub_items[sub_items.duplicated()])):
+        errors.append(f"子項目重複：{name}")
+    if sub_items.empty:
+        errors.append("評分項目沒有任何子項目")
+
+    project_cols = people_df.columns[2:]
+    marks = people_df[project_cols].notna()
+    assigned = marks.any(axis=1)
+    names = people_df[["填答者", "被評者"]]
+    if (names.isna() & assigned.to_numpy()[:, None]).any(axis=None):
+        errors.append("互評名單有已勾選專案但姓名空白的列")
+    self_rows = people_df.loc[assigned & (people_df["填答者"] == people_df["被評者"]), "填答者"]
+    for name in sorted(set(self_rows.astype(str))):
+        errors.append(f"自評：{name} 被指派評自己")
+
+    reviewers, reviewees = set(people_df["被評者"].dropna()), set(people_df["填答者"].dropna())
+    for name in sorted(map(str, reviewers ^ reviewees)):
+        warnings.append(f"姓名只出現在其中一欄（可能打錯或為外部人員）：{name}")
+    for proj in project_cols[~marks.any().to_numpy()]:
+        warnings.append(f"專案沒有任何成員：{proj}")
+    return errors, warnings
+
+
+def compile_survey(questions_df, people_df, version):
+    return Survey(parse_questions(questions_df), build_review_map(people_df), version)
+
+
+@lru_cache(maxsize=8)
+def _compile(questions_path, roster_path, questions_sig, roster_sig):
+    # questions_sig / roster_sig 只用來當 cache key，來源檔一改就會重新編譯
+    return compile_survey(pd.read_excel(questions_path), pd.read_excel(roster_path),
+                          content_hash(_read_bytes(questions_path), _read_bytes(roster_path)))
+
+
+# ---------------------------
+# 預先編譯的問卷包（JSON）：啟動時直接載入，不必解析 Excel
+# ---------------------------
+BUNDLE_FORMAT = 1
+
+
+def save_bundle(survey, path):
+    bundle = {
+        "format": BUNDLE_FORMAT,
+        "version": survey.version,
+        "questions": [[cat, [[q["子項目"], q["說明"]] for q in qlist]] for cat, qlist in survey.questions.items()],
+        "review_map": [[reviewer, [[proj, list(targets)] for proj, targets in projs.items()]]
+                       for reviewer, projs in survey.review_map.items()],
+    }
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(bundle, f, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+@lru_cache(maxsize=8)
+def _load_bundle(path, sig):
+    with open(path, encoding="utf-8") as f:
+        bundle = json.load(f)
+    if bundle.get("format") != BUNDLE_FORMAT:
+        raise ValueError(f"不支援的問卷包格式：{path}")
+    questions = MappingProxyType({
+        cat: tuple(MappingProxyType({"子項目": name, "說明": desc}) for name, desc in qlist)
+        for cat, qlist in bundle["questions"]
+    })
+    review_map = MappingProxyType({
+        reviewer: MappingProxyType({proj: tuple(targets) for proj, targets in projs})
+        for reviewer, projs in bundle["review_map"]
+    })
+    return Survey(questions, review_map, bundle["version"])
+
+
+def load_survey(questions_path, roster_path, bundle_path=None):
+    """回傳編譯好的問卷；同一組檔案未變更時直接重用，不再解析 Excel。
+
+    bundle_path 存在且不比兩個 Excel 舊時，直接載入問卷包。
+    """
+    if bundle_path and os.path.exists(bundle_path):
+        bundle_sig = _file_signature(bundle_path)
+        sources = [p for p in (questions_path, roster_path) if os.path.exists(p)]
+        if all(bundle_sig[0] >= _file_signature(p)[0] for p in sources):
+            return _load_bundle(bundle_path, bundle_sig)
+    return _compile(questions_path, roster_path,
+                    _file_signature(questions_path), _file_signature(roster_path))
@@ -0,0 +1,89 @@
+import logging
+import os
+import threading
+
+from survey_loader import load_survey
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:  # 沒裝 watchdog 時退回每次存取都比對檔案 mtime
+    FileSystemEventHandler, Observer = object, None
+
+logger = logging.getLogger("survey.watch")
+
+# 存檔時 Excel／設定工具常連續觸發多個事件，等檔案寫完再重新解析
+DEBOUNCE_SECONDS = 0.5
+
+
+# ---------------------------
+# 設定檔熱更新：監看評分項目、互評名單與問卷包，變更時整份換成新版本
+# ---------------------------
+class LiveSurvey(FileSystemEventHandler):
+    """目前生效的問卷定義；舊版本保留在 history，進行中的 session 可繼續使用。"""
+
+    def __init__(self, questions_path, roster_path, bundle_path=None):
+        self.paths = (questions_path, roster_path, bundle_path)
+        self._watched = {os.path.abspath(p) for p in self.paths if p}
+        self._lock = threading.Lock()
+        self._timer = None
+        self._observer = None
+        self._current = load_survey(*self.paths)
+        self.history = {self._current.version: self._current}
+
+    @property
+    def current(self):
+        if self._observer is None:
+            self.reload()
+        return self._current
+
+    def get(self, version):
+        """取回 session 開始時的版本；找不到（例如 process 重啟）就用目前版本。"""
+        return self.history.get(version) or self.current
+
+    def reload(self):
+        try:
+            survey = load_survey(*self.paths)
+        except Exception:
+            # 檔案可能還在寫入或內容有誤：保留原版本，下一個事件再試
+            logger.exception("重新載入問卷失敗，沿用版本 %s", self._current.version)
+            return
+        with self._lock:
+            if survey.version != self._current.version:
+                logger.info("問卷更新：%s -> %s", self._current.version, survey.version)
+                self.history[survey.version] = survey
+                self._current = survey
+
+    def start(self):
+        if Observer is None or self._observer is not None:
+            return self
+        observer = Observer()
+        observer.daemon = True
+        folders = {}
+        for folder in {os.path.dirname(p) for p in self._watched}:
+            # 問卷包目錄可能還沒建立，改為遞迴監看最近的既有上層目錄
+            recursive = False
+            while not os.path.isdir(folder):
+                folder, recursive = os.path.dirname(folder), True
+            folders[folder] = folders.get(folder, False) or recursive
+        for folder, recursive in folders.items():
+            observer.schedule(self, folder, recursive=recursive)
+        observer.start()
+        self._observer = observer
+        return self
+
+    def stop(self):
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer = None
+
+    def on_any_event(self, event):
+        paths = {os.path.abspath(p) for p in (event.src_path, getattr(event, "dest_path", "")) if p}
+        if not paths & self._watched:
+            return
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+            self._timer = threading.Timer(DEBOUNCE_SECONDS, self.reload)
+            self._timer.daemon = True
+            self._timer.start()
@@ -0,0 +1,93 @@
+import glob
+import os
+from dataclasses import dataclass, replace
+
+import analytics
+import submit_queue
+from storage import open_store
+
+# ---------------------------
+# 問卷註冊表：一個 process 以網址參數 ?survey=<代號> 服務多份問卷
+# ---------------------------
+@dataclass(frozen=True)
+class SurveyConfig:
+    code: str
+    title: str
+    questions_path: str
+    roster_path: str
+    bundle_path: str
+    results_path: str
+    submitted_path: str
+    db_path: str
+    aggregates_path: str
+    parquet_root: str = "data/results_parquet"
+
+    @property
+    def journal_dir(self):
+        return f"data/journal/{self.code}"
+
+    @property
+    def draft_dir(self):
+        return f"data/drafts/{self.code}"
+
+    def replay_journals(self, store):
+        """補寫已無主人的提交日誌，回傳筆數；匯出、統計等讀取全部結果的工具先呼叫，才不會漏掉已確認的提交。"""
+        return submit_queue.recover(store, self.journal_dir,
+                                    commit=lambda rows: analytics.append(self.aggregates_path, store, rows))
+
+    def open_store(self, backend):
+        # 每份問卷各自的結果儲存；Parquet 共用同一個根目錄，以 survey=<代號> 分區
+        return open_store(backend, results_path=self.results_path, submitted_path=self.submitted_path,
+                          db_path=self.db_path, parquet_root=self.parquet_root, survey=self.code)
+
+
+def by_convention(code, **overrides):
+    """設定工具（config_app.py）發佈問卷時使用的檔名慣例。"""
+    config = SurveyConfig(
+        code=code,
+        title=f"{code}部門內部通評問卷",
+        questions_path=f"data/評分項目_{code}問卷.xlsx",
+        roster_path=f"data/互評名單_{code}問卷.xlsx",
+        bundle_path=f"data/bundles/{code}.json",
+        results_path=f"data/{code}_result.csv",
+        submitted_path=f"data/{code}_submitted_users.csv",
+        db_path=f"data/{code}.db",
+        aggregates_path=f"data/{code}_aggregates.json",
+    )
+    return replace(config, **overrides)
+
+
+_Q1 = by_convention("2025Q1")
+
+# 早於檔名慣例的問卷在這裡明確列出路徑
+REGISTRY = {
+    "2025Q1": replace(_Q1, results_path="data/results.csv", submitted_path="data/submitted_users.csv",
+                      db_path="data/survey.db", aggregates_path="data/aggregates.json"),
+    # RD6 與 2025Q1 共用題目與名單，結果分開存放
+    "2025Q1_RD6": by_convention("2025Q1_RD6", title=_Q1.title, questions_path=_Q1.questions_path,
+                                roster_path=_Q1.roster_path, bundle_path=_Q1.bundle_path),
+}
+
+DEFAULT_SURVEY = os.environ.get("SURVEY_DEFAULT", "2025Q1")
+
+
+def valid_code(code):
+    """問卷代號直接用在檔名裡，不可含路徑分隔字元或 ..。"""
+    return bool(code) and ".." not in code and not any(sep in code for sep in ("/", "\\", os.sep))
+
+
+def get(code):
+    """回傳問卷設定；未註冊但已由設定工具發佈問卷包的代號依檔名慣例推得，都沒有則回傳 None。"""
+    if code in REGISTRY:
+        return REGISTRY[code]
+    if not valid_code(code):
+        return None
+    config = by_convention(code)
+    if os.path.exists(config.bundle_path):
+        return config
+    return None
+
+
+def available():
+    published = (os.path.splitext(os.path.basename(p))[0] for p in glob.glob("data/bundles/*.json"))
+    return list(REGISTRY) + sorted(set(published) - set(REGISTRY))